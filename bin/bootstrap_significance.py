@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+"""
+This script computes the confidence intervals of a metric using the bootstrap
+resampling and, if the outputs of two systems are given, the significance of
+their difference using the paired bootstrap resampling.
+
+Example:
+    bootstrap_significance.py --reference test.de --hypothesis-a model1.de \
+        --hypothesis-b model2.de --metric bleu --samples 1000
+"""
+
+# tests: lint
+
+import argparse
+import numpy as np
+
+from neuralmonkey.evaluators.accuracy import Accuracy
+from neuralmonkey.evaluators.bleu import BLEUEvaluator
+from neuralmonkey.evaluators.chrf import ChrFEvaluator
+from neuralmonkey.evaluators.edit_distance import EditDistance
+from neuralmonkey.evaluators.bootstrap import sentence_statistics, \
+    resampled_scores, confidence_interval, paired_bootstrap
+
+METRICS = {
+    "bleu": BLEUEvaluator,
+    "accuracy": Accuracy,
+    "chrf": ChrFEvaluator,
+    "edit_distance": EditDistance
+}
+
+
+def load_tokenized(text_file):
+    return [line.rstrip().split(" ") if line.strip() else []
+            for line in text_file]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Computes the bootstrap confidence intervals and the "
+        "paired bootstrap significance of the metrics.")
+    parser.add_argument("--reference", type=argparse.FileType('r'),
+                        required=True)
+    parser.add_argument("--hypothesis-a", type=argparse.FileType('r'),
+                        required=True)
+    parser.add_argument("--hypothesis-b", type=argparse.FileType('r'))
+    parser.add_argument("--metric", choices=sorted(METRICS.keys()),
+                        default="bleu")
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    evaluator = METRICS[args.metric]()
+    references = load_tokenized(args.reference)
+    decoded_a = load_tokenized(args.hypothesis_a)
+    if len(decoded_a) != len(references):
+        parser.error("The hypothesis A has {} lines, the reference has {}."
+                     .format(len(decoded_a), len(references)))
+
+    if args.hypothesis_b is None:
+        statistics = sentence_statistics(evaluator, decoded_a, references)
+        scores, = resampled_scores(evaluator, [statistics], args.samples,
+                                   args.seed)
+        low, high = confidence_interval(scores, args.confidence)
+        print("{}: {:.4f}    {:.0f}% confidence interval: [{:.4f}, {:.4f}]"
+              .format(evaluator.name,
+                      evaluator.score_from_statistics(
+                          np.sum(statistics, axis=0)),
+                      100 * args.confidence, low, high))
+        return
+
+    decoded_b = load_tokenized(args.hypothesis_b)
+    if len(decoded_b) != len(references):
+        parser.error("The hypothesis B has {} lines, the reference has {}."
+                     .format(len(decoded_b), len(references)))
+
+    result = paired_bootstrap(evaluator, decoded_a, decoded_b, references,
+                              args.samples, args.confidence, args.seed)
+
+    for system in ["a", "b"]:
+        low, high = result["interval_" + system]
+        print("system {} {}: {:.4f}    {:.0f}% confidence interval: "
+              "[{:.4f}, {:.4f}]".format(
+                  system.upper(), evaluator.name, result["score_" + system],
+                  100 * args.confidence, low, high))
+
+    print("the better system wins in {:.1f}% of {} samples, p-value: {:.4f}"
+          .format(100 * result["wins"], args.samples, result["p_value"]))
+
+
+if __name__ == '__main__':
+    main()
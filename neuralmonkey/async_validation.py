@@ -0,0 +1,292 @@
+"""
+This module implements the validation running asynchronously in a separate
+process.
+
+The training process only saves a checkpoint and sends it to the validator
+process, which builds its own copy of the model from the configuration file,
+evaluates the checkpoint on the validation dataset and maintains the files
+with the N best variables and the link to the best ones. The results are sent
+back to the training process, which only logs them.
+"""
+# tests: lint, mypy
+
+import os
+import glob
+import queue
+import shutil
+import signal
+import traceback
+import multiprocessing
+
+import numpy as np
+
+from neuralmonkey.logging import log
+from neuralmonkey.dataset import Dataset
+from neuralmonkey.checkpointing import atomic_symlink
+from neuralmonkey.config.configuration import Configuration
+from neuralmonkey.config.main_options import ignore_other_options
+
+# how many examples of the decoded sentences are sent back for logging
+EXAMPLES_COUNT = 15
+
+
+def _validator_config():
+    """Creates the configuration loader for the validator process.
+
+    Only the objects needed for the validation are built, the trainer and
+    the training data are ignored.
+    """
+    config = Configuration()
+    config.add_argument('output', str)
+    config.add_argument('encoders', list)
+    config.add_argument('decoder')
+    config.add_argument('val_dataset', Dataset)
+    config.add_argument('postprocess')
+    config.add_argument('evaluation', cond=list)
+    config.add_argument('runner')
+    config.add_argument('threads', int, required=False, default=4)
+    config.add_argument('evaluation_processes', int, required=False,
+                        default=1)
+
+    ignore_other_options(config)
+
+    return config
+
+
+def checkpoint_files(prefix):
+    """Lists the files that belong to a checkpoint.
+
+    Arguments:
+        prefix: The path the checkpoint was saved with.
+
+    Returns:
+        List of tuples of the file paths and their suffixes after the prefix.
+    """
+    files = []
+    for path in glob.glob(glob.escape(prefix) + "*"):
+        suffix = path[len(prefix):]
+        if suffix == "" or suffix.startswith("."):
+            files.append((path, suffix))
+    return files
+
+
+def _copy_checkpoint(source_prefix, target_prefix):
+    for path, suffix in checkpoint_files(source_prefix):
+        shutil.copyfile(path, target_prefix + suffix)
+
+
+def _remove_checkpoint(prefix):
+    for path, _ in checkpoint_files(prefix):
+        os.remove(path)
+
+
+def _is_better(score1, score2, minimize):
+    if minimize:
+        return score1 < score2
+    return score1 > score2
+
+
+class _NBestBookkeeping(object):
+    """Keeps the N best checkpoints and the link to the best one."""
+
+    def __init__(self, variables_files, link_best_vars, minimize_metric):
+        self.variables_files = variables_files
+        self.link_best_vars = link_best_vars
+        self.minimize_metric = minimize_metric
+
+        worst = np.inf if minimize_metric else -np.inf
+        self.saved_scores = [worst for _ in variables_files]
+        self.best_score = worst
+
+    def update(self, checkpoint, score):
+        """Stores the checkpoint if it is among the N best ones.
+
+        Arguments:
+            checkpoint: Path to the evaluated checkpoint.
+            score: The score of the checkpoint.
+
+        Returns:
+            Path of the file the variables were saved to or None.
+        """
+        if _is_better(score, self.best_score, self.minimize_metric):
+            self.best_score = score
+
+        if self.minimize_metric:
+            worst_index = np.argmax(self.saved_scores)
+        else:
+            worst_index = np.argmin(self.saved_scores)
+
+        if not _is_better(score, self.saved_scores[worst_index],
+                          self.minimize_metric):
+            return None
+
+        worst_var_file = self.variables_files[worst_index]
+        _copy_checkpoint(checkpoint, worst_var_file)
+        self.saved_scores[worst_index] = score
+
+        if self.best_score == score:
+            # replace the link atomically, the trainer may read it
+            atomic_symlink(os.path.basename(worst_var_file),
+                           self.link_best_vars)
+
+        return worst_var_file
+
+
+def _validator_main(ini_file, jobs, results, variables_files, link_best_vars,
+                    minimize_metric):
+    """The main function of the validator process."""
+    # pylint: disable=too-many-locals,broad-except,no-member
+    # the interruption is handled by the training process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # imported here, so the training process does not have to import
+    # TensorFlow before the validator is spawned
+    from neuralmonkey.learning_utils import initialize_tf, run_on_dataset, \
+        evaluator_pool
+
+    args = _validator_config().load_file(ini_file)
+    # the validator is a daemonic process, which cannot have children
+    if args.evaluation_processes > 1:
+        log("The evaluators cannot run in separate processes with the "
+            "asynchronous validation, running them sequentially.",
+            color='red')
+    evaluator_pool.processes = 1
+    sess, saver = initialize_tf(None, args.threads)
+    coders = args.encoders + [args.decoder]
+    bookkeeping = _NBestBookkeeping(variables_files, link_best_vars,
+                                    minimize_metric)
+
+    val_raw_tgt_sentences = args.val_dataset.get_series(args.decoder.data_id)
+    if args.postprocess is not None:
+        val_tgt_sentences = args.postprocess(val_raw_tgt_sentences)
+    else:
+        val_tgt_sentences = val_raw_tgt_sentences
+
+    results.put({"ready": True})
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+
+        result = dict(job)
+        try:
+            saver.restore(sess, job["checkpoint"])
+            decoded, decoded_raw, evaluation = run_on_dataset(
+                sess, args.runner, coders, args.decoder, args.val_dataset,
+                args.evaluation, args.postprocess, write_out=False)
+
+            score = evaluation[args.evaluation[-1].name]
+            result["evaluation"] = evaluation
+            result["saved_to"] = bookkeeping.update(job["checkpoint"], score)
+            result["saved_scores"] = list(bookkeeping.saved_scores)
+            result["examples"] = list(zip(
+                decoded[:EXAMPLES_COUNT], decoded_raw[:EXAMPLES_COUNT],
+                val_tgt_sentences[:EXAMPLES_COUNT],
+                val_raw_tgt_sentences[:EXAMPLES_COUNT]))
+        except Exception:
+            result["error"] = traceback.format_exc()
+        finally:
+            _remove_checkpoint(job["checkpoint"])
+
+        results.put(result)
+
+
+class AsyncValidator(object):
+    """Handle of the validator process used by the training loop."""
+
+    def __init__(self, ini_file, variables_files, link_best_vars,
+                 minimize_metric, max_pending=2):
+        """Starts the validator process.
+
+        Arguments:
+            ini_file: The experiment configuration file.
+            variables_files: Files where the N best variables are saved.
+            link_best_vars: Path to the link to the best variables.
+            minimize_metric: Flag whether the main metric is minimized.
+            max_pending: The maximum number of checkpoints waiting for the
+                validation. When reached, the validation is skipped.
+        """
+        self.max_pending = max_pending
+        self.pending = 0
+        self.submitted = 0
+
+        context = multiprocessing.get_context("spawn")
+        self.jobs = context.Queue()
+        self.results = context.Queue()
+        self.process = context.Process(
+            target=_validator_main,
+            args=(ini_file, self.jobs, self.results, variables_files,
+                  link_best_vars, minimize_metric),
+            daemon=True)
+
+        log("Starting the validator process.")
+        self.process.start()
+
+    def submit(self, sess, saver, vars_prefix, **info):
+        """Saves a checkpoint and sends it to the validator.
+
+        Arguments:
+            sess: The training session.
+            saver: Saver of the model variables.
+            vars_prefix: Prefix of the variables files of the experiment.
+            info: Additional information sent back with the results.
+
+        Returns:
+            True if the checkpoint was submitted, False if the validation was
+            skipped because the validator is too far behind.
+        """
+        if self.pending >= self.max_pending:
+            log("Validator is busy, skipping validation.", color='red')
+            return False
+
+        checkpoint = "{}.pending-{}".format(vars_prefix, self.submitted)
+        saver.save(sess, checkpoint, write_meta_graph=False)
+
+        info["checkpoint"] = checkpoint
+        self.jobs.put(info)
+        self.pending += 1
+        self.submitted += 1
+        return True
+
+    def _get(self, block):
+        while True:
+            try:
+                result = self.results.get(block=block, timeout=5)
+            except queue.Empty:
+                if block and self.process.is_alive():
+                    continue
+                if block:
+                    raise RuntimeError("The validator process died.")
+                return None
+
+            if "ready" in result:
+                log("Validator process is ready.")
+                continue
+
+            self.pending -= 1
+            return result
+
+    def poll(self):
+        """Returns the results available without waiting for them."""
+        results = []
+        while True:
+            result = self._get(block=False)
+            if result is None:
+                return results
+            results.append(result)
+
+    def finish(self):
+        """Waits for the remaining results and stops the validator.
+
+        Returns:
+            List of the remaining results.
+        """
+        log("Waiting for {} pending validation(s).".format(self.pending))
+        results = []
+        while self.pending > 0:
+            results.append(self._get(block=True))
+
+        self.jobs.put(None)
+        self.process.join()
+        return results
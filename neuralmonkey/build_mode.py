@@ -0,0 +1,37 @@
+"""This module keeps track of the mode in which the computation graph is
+constructed.
+
+In the inference-only mode, the encoders and decoders build only the part of
+the graph that is needed for running an already trained model, i.e. there is
+no training unroll of the decoder, no training losses and summaries and the
+dropout is not applied at all.
+"""
+# tests: lint, mypy
+
+
+class BuildMode(object):
+
+    inference_only = False # type: bool
+
+    @staticmethod
+    def set_inference_only(value: bool=True) -> None:
+        """Switches the inference-only graph construction on or off.
+
+        This needs to be called before the model objects are built (i.e.
+        before the configuration file is loaded).
+
+        Arguments:
+            value: Flag whether to build only the inference subgraph.
+        """
+        BuildMode.inference_only = value
+
+    @staticmethod
+    def is_inference_only() -> bool:
+        """Returns True when only the runtime graph should be built."""
+        return BuildMode.inference_only
+
+
+# pylint: disable=invalid-name
+# we want these helper functions to have this exact name
+set_inference_only = BuildMode.set_inference_only
+is_inference_only = BuildMode.is_inference_only
@@ -0,0 +1,152 @@
+"""
+This module implements writing of the model checkpoints during training.
+
+The asynchronous writer first copies the variables into shadow variables,
+which is a fast in-memory operation, and serializes the shadow variables to
+disk in a background thread while the training continues.
+
+Along with a checkpoint, the state of the training loop (the step, the
+position in the training data and the states of the random generators) can
+be stored, so the training can be resumed exactly where it stopped.
+"""
+# tests: lint, mypy
+
+import os
+import pickle
+import threading
+
+import tensorflow as tf
+
+from neuralmonkey.logging import log
+
+STATE_SUFFIX = ".state"
+
+
+def atomic_symlink(target, link_name):
+    """Creates or replaces a symbolic link atomically, so there is no moment
+    when the link does not exist.
+
+    Arguments:
+        target: The path the link points to.
+        link_name: The path of the link.
+    """
+    tmp_link = link_name + ".tmp"
+    if os.path.lexists(tmp_link):
+        os.unlink(tmp_link)
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, link_name)
+
+
+def save_state(path, state):
+    """Pickles the training state next to a checkpoint.
+
+    Arguments:
+        path: Path of the checkpoint.
+        state: Dictionary with the state of the training loop.
+    """
+    with open(path + STATE_SUFFIX, 'wb') as f_state:
+        pickle.dump(state, f_state)
+
+
+def load_state(path):
+    """Loads the training state stored next to a checkpoint.
+
+    Arguments:
+        path: Path of the checkpoint.
+
+    Returns:
+        The state dictionary or None if there is no state file.
+    """
+    if not os.path.exists(path + STATE_SUFFIX):
+        return None
+    with open(path + STATE_SUFFIX, 'rb') as f_state:
+        return pickle.load(f_state)
+
+
+class CheckpointWriter(object):
+    """Writes the checkpoints synchronously."""
+
+    def __init__(self, saver):
+        """Creates a new writer.
+
+        Arguments:
+            saver: The saver of the model variables.
+        """
+        self.saver = saver
+
+    def save(self, sess, path, link_name=None, state=None):
+        """Saves the variables.
+
+        Arguments:
+            sess: TF session.
+            path: Path of the checkpoint.
+            link_name: If provided, the link which is pointed to the
+                checkpoint after it is written.
+            state: If provided, the training state which is pickled next to
+                the checkpoint (see ``save_state``).
+        """
+        self.saver.save(sess, path)
+        if state is not None:
+            save_state(path, state)
+        if link_name is not None:
+            atomic_symlink(os.path.basename(path), link_name)
+
+    def wait(self):
+        """Waits until all the checkpoints are written."""
+        pass
+
+
+class AsyncCheckpointWriter(CheckpointWriter):
+    """Writes the checkpoints in a background thread.
+
+    Only one checkpoint is written at a time, because there is only one set
+    of shadow variables. A save requested while the previous one is still in
+    progress waits for it.
+    """
+
+    def __init__(self, variables=None):
+        """Creates the shadow variables and the writer thread.
+
+        Arguments:
+            variables: The variables to save. Defaults to all variables.
+        """
+        if variables is None:
+            variables = tf.all_variables()
+
+        # the shadow variables are not in any collection, so they are not
+        # saved nor initialized together with the model
+        with tf.variable_scope("checkpoint_shadow"):
+            shadows = [tf.Variable(tf.zeros(v.get_shape(),
+                                            dtype=v.dtype.base_dtype),
+                                   trainable=False, collections=[],
+                                   name=v.op.name.replace("/", "_"))
+                       for v in variables]
+
+        self.snapshot_op = tf.group(*[tf.assign(s, v) for s, v
+                                      in zip(shadows, variables)])
+
+        # the checkpoint has the names of the original variables
+        super(AsyncCheckpointWriter, self).__init__(tf.train.Saver(
+            {v.op.name: s for v, s in zip(variables, shadows)}))
+
+        self._in_flight = None # type: threading.Thread
+
+    def save(self, sess, path, link_name=None, state=None):
+        self.wait()
+        sess.run(self.snapshot_op)
+
+        def write():
+            try:
+                CheckpointWriter.save(self, sess, path, link_name, state)
+            # pylint: disable=broad-except
+            except Exception as exc:
+                log("Checkpoint {} could not be written: {}"
+                    .format(path, exc), color='red')
+
+        self._in_flight = threading.Thread(target=write, daemon=True)
+        self._in_flight.start()
+
+    def wait(self):
+        if self._in_flight is not None:
+            self._in_flight.join()
+            self._in_flight = None
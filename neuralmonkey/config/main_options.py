@@ -0,0 +1,36 @@
+"""This module lists the options of the main section of the experiment
+configuration.
+
+The same configuration file is loaded by the training script, by the running
+script, by the asynchronous validator and by the data-parallel workers. Each
+of them builds only the objects it needs and ignores the other options, so
+a new option has to be added only here and to the loader that uses it.
+"""
+#tests: lint
+
+MAIN_OPTIONS = (
+    # the model
+    'encoders', 'decoder', 'runner', 'postprocess', 'evaluation',
+    # the experiment
+    'name', 'output', 'random_seed', 'threads', 'overwrite_output_dir',
+    # the training
+    'trainer', 'epochs', 'batch_size', 'train_dataset', 'val_dataset',
+    'test_datasets', 'initial_variables', 'validation_period',
+    'logging_period', 'minimize', 'save_n_best', 'async_validation',
+    'feed_dict_cache_mb', 'log_from_train_step', 'workers',
+    'async_checkpoints', 'resume', 'step_timing', 'trace_period',
+    'trace_validation_period', 'evaluation_processes',
+    # the running
+    'graph_snapshot', 'frozen_model')
+
+
+def ignore_other_options(config):
+    """Makes a configuration loader ignore all the main section options it
+    does not define, so the objects configured by them are not built.
+
+    Arguments:
+        config: The Configuration object with the arguments already added.
+    """
+    for name in MAIN_OPTIONS:
+        if name not in config.data_types:
+            config.ignore_argument(name)
@@ -0,0 +1,215 @@
+"""
+This module implements the synchronous data-parallel training in local
+worker processes.
+
+Each worker process builds its own replica of the model from the
+configuration file. In every step, the batch is split into shards, each
+process (including the main training process) computes the gradients on its
+shard and the gradients are averaged in the main process. The averaged
+gradients are then applied in all the replicas by the same optimizer, so the
+replicas stay identical without sending the model parameters around.
+"""
+# tests: lint, mypy
+
+import math
+import signal
+import traceback
+import multiprocessing
+
+import numpy as np
+
+from neuralmonkey.logging import log
+from neuralmonkey.config.configuration import Configuration
+from neuralmonkey.config.main_options import ignore_other_options
+
+
+def _worker_config():
+    """Creates the configuration loader for the worker processes.
+
+    Only the model and the trainer are built, the datasets are sent to the
+    workers by the main process.
+    """
+    config = Configuration()
+    config.add_argument('encoders', list)
+    config.add_argument('decoder')
+    config.add_argument('trainer')
+    config.add_argument('random_seed', int, required=False)
+    config.add_argument('threads', int, required=False, default=4)
+
+    ignore_other_options(config)
+
+    return config
+
+
+def average_gradients(gradient_lists, weights):
+    """Computes the weighted average of the gradients from several workers.
+
+    Arguments:
+        gradient_lists: List of the lists of gradient values computed by the
+            workers. The sparse gradients are IndexedSlicesValue tuples.
+        weights: The weights of the workers (e.g. the shard sizes).
+
+    Returns:
+        List of the averaged gradient values.
+    """
+    weights = np.array(weights, dtype=np.float32) / np.sum(weights)
+
+    averaged = []
+    for grads in zip(*gradient_lists):
+        if hasattr(grads[0], "indices"):
+            # the sparse gradients are concatenated, rows with the same index
+            # are summed when the gradient is applied
+            averaged.append(type(grads[0])(
+                values=np.concatenate([w * g.values
+                                       for w, g in zip(weights, grads)]),
+                indices=np.concatenate([g.indices for g in grads]),
+                dense_shape=grads[0].dense_shape))
+        else:
+            averaged.append(sum(w * g for w, g in zip(weights, grads)))
+
+    return averaged
+
+
+def _worker_main(ini_file, worker_id, initial_variables, jobs, results):
+    """The main function of a worker process."""
+    # pylint: disable=broad-except,no-member
+    # the interruption is handled by the training process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # imported here, so the training process does not have to import
+    # TensorFlow before the workers are spawned
+    import tensorflow as tf
+    from neuralmonkey.learning_utils import initialize_tf, feed_dicts
+
+    try:
+        args = _worker_config().load_file(ini_file)
+        if args.random_seed is not None:
+            tf.set_random_seed(args.random_seed + worker_id)
+
+        sess, _ = initialize_tf(initial_variables, args.threads)
+        coders = args.encoders + [args.decoder]
+        trainer = args.trainer
+    except Exception:
+        results.put((worker_id, "error", traceback.format_exc()))
+        return
+
+    results.put((worker_id, "ready", None))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+
+        kind, data = job
+        try:
+            if kind == "gradients":
+                batch_feed_dict = feed_dicts(data, coders, train=True)
+                gradients, _ = trainer.compute_gradients(sess,
+                                                         batch_feed_dict)
+                results.put((worker_id, "gradients", gradients))
+            elif kind == "apply":
+                trainer.apply_gradients(sess, data)
+        except Exception:
+            results.put((worker_id, "error", traceback.format_exc()))
+
+
+class DataParallelTrainer(object):
+    """Runs the training steps of a trainer on several local processes.
+
+    The main process works as the first worker.
+    """
+
+    def __init__(self, trainer, ini_file, workers, initial_variables):
+        """Starts the worker processes.
+
+        Arguments:
+            trainer: The trainer of the main process. It must provide the
+                ``compute_gradients`` and ``apply_gradients`` methods.
+            ini_file: The experiment configuration file.
+            workers: The total number of workers including the main process.
+            initial_variables: Checkpoint with the initial values of the
+                variables the replicas are initialized from.
+        """
+        if workers < 2:
+            raise ValueError("At least two workers are needed.")
+        if not hasattr(trainer, "compute_gradients"):
+            raise ValueError("The trainer does not support data-parallel "
+                             "training.")
+
+        self.trainer = trainer
+        self.workers = workers
+
+        context = multiprocessing.get_context("spawn")
+        self.results = context.Queue()
+        self.jobs = [context.Queue() for _ in range(workers - 1)]
+        self.processes = [
+            context.Process(target=_worker_main,
+                            args=(ini_file, i + 1, initial_variables, jobs,
+                                  self.results),
+                            daemon=True)
+            for i, jobs in enumerate(self.jobs)]
+
+        log("Starting {} worker processes.".format(workers - 1))
+        for process in self.processes:
+            process.start()
+
+        self._collect("ready", workers - 1)
+        log("Worker processes are ready.")
+
+    def _collect(self, kind, count):
+        collected = {}
+        while len(collected) < count:
+            worker_id, result_kind, data = self.results.get()
+            if result_kind == "error":
+                raise RuntimeError("Worker {} failed:\n{}"
+                                   .format(worker_id, data))
+            if result_kind != kind:
+                raise RuntimeError("Unexpected result '{}' from worker {}."
+                                   .format(result_kind, worker_id))
+            collected[worker_id] = data
+        return collected
+
+    def run(self, sess, batch_dataset, coders, summary=False):
+        """Performs one synchronous training step.
+
+        Arguments:
+            sess: The session of the main process.
+            batch_dataset: The batch that is split among the workers.
+            coders: The encoders and decoders of the main process.
+            summary: Flag whether to compute the training summaries (on the
+                shard of the main process).
+
+        Returns:
+            The summary string or None.
+        """
+        # pylint: disable=no-member
+        from neuralmonkey.learning_utils import feed_dicts
+
+        shard_size = int(math.ceil(len(batch_dataset) / self.workers))
+        shards = list(batch_dataset.batch_dataset(shard_size))
+
+        for jobs, shard in zip(self.jobs, shards[1:]):
+            jobs.put(("gradients", shard))
+
+        batch_feed_dict = feed_dicts(shards[0], coders, train=True)
+        gradients, summary_str = self.trainer.compute_gradients(
+            sess, batch_feed_dict, summary=summary)
+
+        worker_gradients = self._collect("gradients", len(shards) - 1)
+        averaged = average_gradients(
+            [gradients] + [worker_gradients[i + 1]
+                           for i in range(len(shards) - 1)],
+            [len(shard) for shard in shards])
+
+        for jobs in self.jobs:
+            jobs.put(("apply", averaged))
+        self.trainer.apply_gradients(sess, averaged)
+
+        return summary_str
+
+    def finish(self):
+        """Stops the worker processes."""
+        for jobs in self.jobs:
+            jobs.put(None)
+        for process in self.processes:
+            process.join()
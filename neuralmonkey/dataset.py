@@ -162,6 +162,9 @@ class Dataset(collections.Sized):
         self._series = series
         self.series_outputs = series_outputs
 
+        # indices of the items in the original order, None if unchanged
+        self.permutation = None # type: List[int]
+
         self._check_series_lengths()
 
 
@@ -228,11 +231,29 @@ class Dataset(collections.Sized):
 
     def shuffle(self) -> None:
         """Shuffle the dataset randomly """
-        keys = list(self._series.keys())
-        zipped = list(zip(*[self._series[k] for k in keys]))
-        random.shuffle(zipped)
-        for key, serie in zip(keys, list(zip(*zipped))):
-            self._series[key] = serie
+        order = list(range(len(self)))
+        random.shuffle(order)
+        self.permute(order)
+
+
+    def permute(self, order: List[int]) -> None:
+        """Reorder the dataset.
+
+        The permutations are composed, so a freshly loaded dataset permuted
+        by the ``permutation`` attribute of another instance gets the same
+        order of items as the other instance.
+
+        Arguments:
+            order: The indices of the current items in the new order.
+        """
+        for key in self._series:
+            serie = self._series[key]
+            self._series[key] = tuple(serie[i] for i in order)
+
+        if self.permutation is None:
+            self.permutation = list(order)
+        else:
+            self.permutation = [self.permutation[i] for i in order]
 
 
     def batch_serie(self, serie_name: str,
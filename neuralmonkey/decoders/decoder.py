@@ -7,6 +7,8 @@ import numpy as np
 from neuralmonkey.vocabulary import START_TOKEN
 from neuralmonkey.decoding_function import attention_decoder
 from neuralmonkey.logging import log
+from neuralmonkey.build_mode import is_inference_only
+from neuralmonkey.nn.utils import dropout
 
 class Decoder(object):
     """A class that manages parts of the computation graph that are
@@ -39,6 +41,15 @@ class Decoder(object):
                 from the first encoder will be used
             project_encoder_outputs: Boolean flag whether to project output
                 states of encoders
+            shortlist: LexicalShortlist object. If provided, the runtime
+                decoding considers only the candidate words selected by the
+                shortlist for each batch. The losses still use the full
+                vocabulary.
+            sampled_softmax_samples: Number of the negative samples used for
+                the sampled softmax training loss. If not provided, no sampled
+                loss is created.
+            sampled_loss_type: Either 'sampled_softmax' (default) or 'nce'
+                for the noise-contrastive estimation loss.
         """
         self.encoders = encoders
         self.vocabulary = vocabulary
@@ -53,6 +64,15 @@ class Decoder(object):
         self.reuse_word_embeddings = kwargs.get("reuse_word_embeddings", False)
         self.project_encoder_outputs = kwargs.get("project_encoder_outputs",
                                                   False)
+        self.shortlist = kwargs.get("shortlist", None)
+        self.sampled_softmax_samples = kwargs.get("sampled_softmax_samples",
+                                                  None)
+        self.sampled_loss_type = kwargs.get("sampled_loss_type",
+                                            "sampled_softmax")
+
+        if self.sampled_loss_type not in ["sampled_softmax", "nce"]:
+            raise ValueError("Unknown sampled loss type: {}"
+                             .format(self.sampled_loss_type))
 
         log("Initializing decoder, name: '{}'".format(self.name))
 
@@ -79,48 +99,75 @@ class Decoder(object):
         self.go_symbols = tf.placeholder(tf.int32, shape=[None],
                                          name="decoder_go_symbols")
 
+        if self.shortlist is not None:
+            self.shortlist_indices, self.shortlist_weights, \
+                self.shortlist_biases = self._shortlist_projection()
+            # fed instead of the candidates in training, the runtime outputs
+            # computed there (e.g. for the summaries) use the full vocabulary
+            self._all_word_indices = np.arange(self.vocabulary_size,
+                                               dtype=np.int32)
+
         cell = self._get_rnn_cell()
         attention_objects = self._collect_attention_objects(self.encoders)
 
         ### Construct the computation part of the graph
 
-        embedded_train_inputs = self._embed_inputs(self.train_inputs[:-1])
+        # in the inference-only mode, the training unroll is not built at all
+        # and the runtime unroll creates the shared variables itself
+        if is_inference_only():
+            self.train_rnn_outputs = None
+        else:
+            embedded_train_inputs = self._embed_inputs(self.train_inputs[:-1])
+
+            self.train_rnn_outputs, _ = attention_decoder(
+                embedded_train_inputs, state, attention_objects,
+                self.embedding_size, cell)
 
-        self.train_rnn_outputs, _ = attention_decoder(
-            embedded_train_inputs, state, attention_objects,
-            self.embedding_size, cell)
+            ### Use the same variables for runtime decoding!
+            tf.get_variable_scope().reuse_variables()
 
         # runtime methods and objects are used when no ground truth is provided
         # (such as during testing)
         runtime_inputs = self._runtime_inputs(self.go_symbols)
         loop_function = self._get_loop_function()
 
-        ### Use the same variables for runtime decoding!
-        tf.get_variable_scope().reuse_variables()
-
         self.runtime_rnn_outputs, _ = attention_decoder(
             runtime_inputs, state, attention_objects, self.embedding_size,
             cell, loop_function=loop_function)
 
-        _, train_logits = self._decode(self.train_rnn_outputs)
         self.decoded, runtime_logits = self._decode(self.runtime_rnn_outputs)
-
-        self.train_loss = tf.nn.seq2seq.sequence_loss(
-            train_logits, train_targets, self.train_weights,
-            self.vocabulary_size)
+        if self.shortlist is not None:
+            self.decoded = self._decode_shortlist(self.runtime_rnn_outputs)
 
         self.runtime_loss = tf.nn.seq2seq.sequence_loss(
             runtime_logits, train_targets, self.train_weights,
             self.vocabulary_size)
 
-        ### Learning step
-        ### TODO was here only because of scheduled sampling.
-        ### needs to be refactored out
-        self.learning_step = tf.Variable(0, name="learning_step",
-                                         trainable=False)
+        if is_inference_only():
+            self.train_loss = None
+            self.sampled_loss = None
+        else:
+            _, train_logits = self._decode(self.train_rnn_outputs)
+
+            self.train_loss = tf.nn.seq2seq.sequence_loss(
+                train_logits, train_targets, self.train_weights,
+                self.vocabulary_size)
+
+            # the full softmax loss is still used for validation
+            if self.sampled_softmax_samples:
+                self.sampled_loss = self._sampled_loss(
+                    self.train_rnn_outputs, train_targets)
+            else:
+                self.sampled_loss = None
+
+            ### Learning step
+            ### TODO was here only because of scheduled sampling.
+            ### needs to be refactored out
+            self.learning_step = tf.Variable(0, name="learning_step",
+                                             trainable=False)
 
-        ### Summaries
-        self._init_summaries()
+            ### Summaries
+            self._init_summaries()
 
         log("Decoder initialized.")
 
@@ -173,7 +220,7 @@ class Decoder(object):
         Arguments:
             var: The variable to perform the dropout on
         """
-        return tf.nn.dropout(var, self.dropout_placeholder)
+        return dropout(var, self.dropout_placeholder)
 
 
     def _state_to_output(self):
@@ -190,6 +237,22 @@ class Decoder(object):
         return weights, biases
 
 
+    def _shortlist_projection(self):
+        """Create the placeholder for the shortlist and the projection of
+        states to the shortlisted output vectors.
+
+        The rows of the output projection are gathered only once per run,
+        not in every decoding step.
+        """
+        indices = tf.placeholder(tf.int32, shape=[None],
+                                 name="decoder_shortlist")
+
+        weights = tf.gather(tf.transpose(self.weights), indices)
+        biases = tf.gather(self.biases, indices)
+
+        return indices, weights, biases
+
+
     def _input_embeddings(self):
         """Create variables and operations for embedding of input words
 
@@ -274,8 +337,14 @@ class Decoder(object):
                 previous_state: The state of the decoder
                 i: Unused argument, number of the time step
             """
-            output_activation = self._logit_function(previous_state)
-            previous_word = tf.argmax(output_activation, 1)
+            if self.shortlist is not None:
+                output_activation = self._shortlist_logit_function(
+                    previous_state)
+                previous_word = tf.gather(self.shortlist_indices,
+                                          tf.argmax(output_activation, 1))
+            else:
+                output_activation = self._logit_function(previous_state)
+                previous_word = tf.argmax(output_activation, 1)
             input_embedding = tf.nn.embedding_lookup(self.embedding_matrix,
                                                      previous_word)
 
@@ -293,6 +362,32 @@ class Decoder(object):
         return tf.matmul(self._dropout(state), self.weights) + self.biases
 
 
+    def _shortlist_logit_function(self, state):
+        """Compute logits on the shortlisted words given the state
+
+        Arguments:
+            state: the state of the decoder
+        """
+        return tf.matmul(self._dropout(state), self.shortlist_weights,
+                         transpose_b=True) + self.shortlist_biases
+
+
+    def _decode_shortlist(self, rnn_states):
+        """Decodes a sequence from a list of hidden states considering only
+        the shortlisted words.
+
+        The first item of the shortlist is always the padding symbol, which
+        is excluded from the decoding in the same way as in ``_decode``.
+
+        Arguments:
+            rnn_states: hidden states
+        """
+        logits = [self._shortlist_logit_function(s) for s in rnn_states]
+        return [tf.gather(self.shortlist_indices,
+                          tf.to_int32(tf.argmax(l[:, 1:], 1) + 1))
+                for l in logits]
+
+
     def _decode(self, rnn_states):
         """Decodes a sequence from a list of hidden states
 
@@ -305,6 +400,42 @@ class Decoder(object):
         return decoded, logits
 
 
+    def _sampled_loss(self, rnn_states, targets):
+        """Computes the sampled softmax (or NCE) loss which approximates
+        the cross-entropy over the full vocabulary using only a few sampled
+        output words in every step.
+
+        The losses in the steps are weighted and averaged in the same way as
+        in ``tf.nn.seq2seq.sequence_loss``.
+
+        Arguments:
+            rnn_states: hidden states of the training unroll
+            targets: list of the target word indices for every step
+        """
+        if self.sampled_loss_type == "nce":
+            loss_function = tf.nn.nce_loss
+        else:
+            loss_function = tf.nn.sampled_softmax_loss
+
+        output_vectors = tf.transpose(self.weights)
+        num_sampled = min(self.sampled_softmax_samples, self.vocabulary_size)
+
+        step_losses = []
+        for state, target, weight in zip(rnn_states, targets,
+                                         self.train_weights):
+            labels = tf.expand_dims(tf.to_int64(target), 1)
+            loss = loss_function(output_vectors, self.biases,
+                                 self._dropout(state), labels, num_sampled,
+                                 self.vocabulary_size)
+            step_losses.append(loss * weight)
+
+        log_perps = tf.add_n(step_losses) / (tf.add_n(self.train_weights)
+                                             + 1e-12)
+        batch_size = tf.to_float(tf.shape(targets[0])[0])
+
+        return tf.reduce_sum(log_perps) / batch_size
+
+
     def _init_summaries(self):
         """Initialize the summaries of the decoder
 
@@ -319,6 +450,10 @@ class Decoder(object):
         tf.scalar_summary("train_optimization_cost", self.train_loss,
                           collections=["summary_train"])
 
+        if self.sampled_loss is not None:
+            tf.scalar_summary("train_sampled_loss", self.sampled_loss,
+                              collections=["summary_train"])
+
 
     def feed_dict(self, dataset, train=False):
         """Populate the feed dictionary for the decoder object
@@ -345,6 +480,14 @@ class Decoder(object):
         start_token_index = self.vocabulary.get_word_index(START_TOKEN)
         fd[self.go_symbols] = np.repeat(start_token_index, len(dataset))
 
+        if self.shortlist is not None:
+            # the candidates are only needed for the inference
+            if train:
+                fd[self.shortlist_indices] = self._all_word_indices
+            else:
+                fd[self.shortlist_indices] = self.shortlist.candidates(
+                    dataset)
+
         sentences = dataset.get_series(self.data_id, allow_none=True)
 
         if sentences is not None:
@@ -1,5 +1,7 @@
 import tensorflow as tf
 
+from neuralmonkey.nn.utils import dropout
+
 def attention_decoder(decoder_inputs, initial_state, attention_objects,
                       embedding_size, cell, output_size=None,
                       loop_function=None, dtype=tf.float32, scope=None):
@@ -59,8 +61,8 @@ class Attention(object):
                  input_weights=None, max_fertility=None):
         self.scope = scope
         self.attentions_in_time = []
-        self.attention_states = tf.nn.dropout(attention_states,
-                                              dropout_placeholder)
+        self.attention_states = dropout(attention_states,
+                                        dropout_placeholder)
         self.input_weights = input_weights
 
         with tf.variable_scope(scope):
@@ -141,10 +143,29 @@ class CoverageAttention(Attention):
         self.fertility = 1e-8 + self.max_fertility * tf.sigmoid(
             tf.reduce_sum(self.fertility_weights * self.attention_states, [2]))
 
+        # running sum of the attentions in the current unroll, it is carried
+        # through the decoder loop instead of summing the whole history in
+        # every step
+        self.attention_sum = None
+
+
+    def attention(self, query_state):
+        context = super(CoverageAttention, self).attention(query_state)
+
+        if self.attention_sum is None:
+            self.attention_sum = self.attentions_in_time[-1]
+        else:
+            self.attention_sum += self.attentions_in_time[-1]
+
+        return context
+
 
     def get_logits(self, y):
-        coverage = sum(
-            self.attentions_in_time) / self.fertility * self.input_weights
+        # with no attention history, the coverage is zero
+        if self.attention_sum is None:
+            return super(CoverageAttention, self).get_logits(y)
+
+        coverage = self.attention_sum / self.fertility * self.input_weights
 
         logits = tf.reduce_sum(
             self.v * tf.tanh(
@@ -153,3 +174,9 @@ class CoverageAttention(Attention):
             [2, 3])
 
         return logits
+
+
+    def initialize(self, batch_size, dtype):
+        # each unroll of the decoder starts with an empty coverage
+        self.attention_sum = None
+        return super(CoverageAttention, self).initialize(batch_size, dtype)
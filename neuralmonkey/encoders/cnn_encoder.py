@@ -6,6 +6,8 @@ a CNN, followed by a sequential processing by RNN.
 import numpy as np
 import tensorflow as tf
 from neuralmonkey.decoding_function import Attention
+from neuralmonkey.nn.utils import dropout
+from neuralmonkey.build_mode import is_inference_only
 
 # tests: mypy
 
@@ -150,7 +152,7 @@ class CNNEncoder(object):
                         if batch_normalization:
                             last_layer = batch_norm(last_layer, n_filters, self.is_training)
 
-                        last_layer = tf.nn.dropout(last_layer, keep_prob=self.dropout_placeholder)
+                        last_layer = dropout(last_layer, self.dropout_placeholder)
 
                 last_layer = last_layer * last_padding_masks
             last_layer_size = last_n_channels * image_height * image_width
@@ -252,9 +254,14 @@ def batch_norm(tensor, n_out, phase_train, scope='bn', scale_after_norm=True):
         def mean_var_with_update():
             with tf.control_dependencies([ema_apply_op]):
                 return tf.identity(batch_mean), tf.identity(batch_var)
-        mean, var = tf.cond(phase_train,
-                            mean_var_with_update,
-                            lambda: (ema_mean, ema_var))
+
+        # there are no batch statistics to update when only running the model
+        if is_inference_only():
+            mean, var = ema_mean, ema_var
+        else:
+            mean, var = tf.cond(phase_train,
+                                mean_var_with_update,
+                                lambda: (ema_mean, ema_var))
 
         normed = \
                 tf.nn.batch_norm_with_global_normalization(tensor, mean, var,
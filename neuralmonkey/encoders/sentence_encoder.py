@@ -5,6 +5,8 @@ from neuralmonkey.logging import log
 from neuralmonkey.nn.bidirectional_rnn_layer import BidirectionalRNNLayer
 from neuralmonkey.nn.noisy_gru_cell import NoisyGRUCell
 from neuralmonkey.nn.pervasive_dropout_wrapper import PervasiveDropoutWrapper
+from neuralmonkey.nn.utils import dropout
+from neuralmonkey.build_mode import is_inference_only
 from neuralmonkey.checking import assert_type
 from neuralmonkey.vocabulary import Vocabulary
 
@@ -60,11 +62,11 @@ class SentenceEncoder(object):
                 self.word_embeddings = tf.Variable(tf.random_uniform(
                     [len(vocabulary), embedding_size], -1.0, 1.0))
 
-            embedded_inputs = [tf.nn.embedding_lookup(self.word_embeddings, i)
-                               for i in self.inputs]
-            dropped_embedded_inputs = [
-                tf.nn.dropout(i, self.dropout_placeholder)
-                for i in embedded_inputs]
+            # all time steps are embedded at once as a time-major tensor
+            embedded_inputs = tf.nn.embedding_lookup(self.word_embeddings,
+                                                     tf.pack(self.inputs))
+            dropped_embedded_inputs = dropout(embedded_inputs,
+                                              self.dropout_placeholder)
 
             if parent_encoder:
                 self.forward_gru = parent_encoder.forward_gru
@@ -77,7 +79,8 @@ class SentenceEncoder(object):
                     self.forward_gru = tf.nn.rnn_cell.GRUCell(rnn_size)
                     self.backward_gru = tf.nn.rnn_cell.GRUCell(rnn_size)
 
-            if use_pervasive_dropout:
+            # the pervasive dropout mask is all ones when not training
+            if use_pervasive_dropout and not is_inference_only():
 
                 # create dropout mask (shape batch x rnn_size)
                 # floor (random uniform + dropout_keep)
@@ -107,9 +110,7 @@ class SentenceEncoder(object):
 
             self.outputs_bidi = bidi_layer.outputs_bidi
             self.encoded = bidi_layer.encoded
-
-            self.attention_tensor = tf.concat(1, [tf.expand_dims(o, 1)
-                                                  for o in self.outputs_bidi])
+            self.attention_tensor = bidi_layer.attention_tensor
 
             self.attention_object = attention_type(
                 self.attention_tensor, scope="attention_{}".format(name),
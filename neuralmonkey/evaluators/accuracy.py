@@ -13,6 +13,24 @@ class Accuracy(object):
                         for dec, ref in zip(decoded, references)
                         for d, r in zip(dec, ref)])
 
+    @staticmethod
+    def sufficient_statistics(decoded, references):
+        # type: (List[List[str]], List[List[str]]) -> np.ndarray
+        """Counts the correct and all compared tokens."""
+        correct = 0
+        total = 0
+        for dec, ref in zip(decoded, references):
+            correct += sum(d == r for d, r in zip(dec, ref))
+            total += min(len(dec), len(ref))
+        return np.array([correct, total], dtype=np.float64)
+
+    @staticmethod
+    def score_from_statistics(statistics):
+        # type: (np.ndarray) -> float
+        if statistics[1] == 0:
+            return np.nan
+        return statistics[0] / statistics[1]
+
     @staticmethod
     def compare_scores(score1, score2):
         # type: (float, float) -> int
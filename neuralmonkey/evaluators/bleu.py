@@ -3,10 +3,82 @@
 from collections import Counter
 import numpy as np
 
+from neuralmonkey.evaluators.reference_cache import ReferenceCache
+
+try:
+    #pylint: disable=unused-import,bare-except,invalid-name
+    from typing import Dict, List, Tuple
+except:
+    pass
+
+class ReferenceStatistics(object):
+    """Precomputed n-gram counts of a reference corpus.
+
+    The tokens are mapped to integer IDs, so the n-grams are tuples of
+    integers which are cheaper to hash than joined strings. The tokens of the
+    hypotheses which do not appear in the references get the ID -1, so the
+    n-grams containing them never match.
+    """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, references_list, max_order):
+        # type: (List[List[List[str]]], int) -> None
+        """Counts the n-grams of the references.
+
+        Arguments:
+            references_list: List of lists of references (as lists of words)
+            max_order: The maximum order of the counted n-grams.
+        """
+        self.max_order = max_order
+        self.vocabulary = {} # type: Dict[str, int]
+        self.lengths = [[len(ref) for ref in references]
+                        for references in references_list]
+
+        # counts[i][n - 1] are the n-gram counts of the i-th sentence merged
+        # over its references using the maximum values
+        self.counts = []  # type: List[List[Counter]]
+        for references in references_list:
+            ids_list = [self.token_ids(ref, extend=True)
+                        for ref in references]
+            self.counts.append([
+                BLEUEvaluator.merge_max_counters(
+                    [BLEUEvaluator.id_ngram_counts(ids, order)
+                     for ids in ids_list])
+                for order in range(1, max_order + 1)])
+
+    def token_ids(self, sentence, extend=False):
+        # type: (List[str], bool) -> List[int]
+        """Maps the tokens of a sentence to the integer IDs.
+
+        Arguments:
+            sentence: Sentence as a list of words
+            extend: Whether to add the unknown tokens to the vocabulary.
+        """
+        if extend:
+            return [self.vocabulary.setdefault(w, len(self.vocabulary))
+                    for w in sentence]
+        return [self.vocabulary.get(w, -1) for w in sentence]
+
+
 class BLEUEvaluator(object):
-    def __init__(self, n=4, deduplicate=False, name=None):
+    def __init__(self, n=4, deduplicate=False, name=None,
+                 cache_references=True):
+        """Creates the BLEU evaluator.
+
+        Arguments:
+            n: Maximum order of n-grams.
+            deduplicate: Whether to remove the repeated consecutive words
+                from the hypotheses before the evaluation.
+            name: The name of the metric.
+            cache_references: Whether to keep the n-gram counts of the few
+                most recently evaluated reference corpora, so the references
+                evaluated repeatedly (e.g. in the validation) are processed
+                only once.
+        """
         self.n = n
         self.deduplicate = deduplicate
+        self.cache_references = cache_references
+        self._reference_cache = ReferenceCache()
 
         if name is not None:
             self.name = name
@@ -23,9 +95,45 @@ class BLEUEvaluator(object):
         if self.deduplicate:
             decoded = BLEUEvaluator._deduplicate_sentences(decoded)
 
+        if self.cache_references:
+            return 100 * BLEUEvaluator.bleu_with_statistics(
+                decoded, self.reference_statistics(references), self.n)
+
         return 100 * BLEUEvaluator.bleu(decoded, listed_references, self.n)
 
 
+    def reference_statistics(self, references):
+        # type: (List[List[str]]) -> ReferenceStatistics
+        """Returns the n-gram counts of the references, computed only if the
+        references are not among the recently evaluated ones.
+
+        Arguments:
+            references: List of reference sentences (as lists of words)
+        """
+        return self._reference_cache.get(
+            references,
+            lambda refs: ReferenceStatistics([[ref] for ref in refs], self.n))
+
+
+    def sufficient_statistics(self, decoded, references):
+        # type: (List[List[str]], List[List[str]]) -> np.ndarray
+        """Computes the statistics of a part of the corpus. The statistics
+        of the parts can be summed and scored with ``score_from_statistics``.
+        """
+        if self.deduplicate:
+            decoded = BLEUEvaluator._deduplicate_sentences(decoded)
+
+        return BLEUEvaluator.corpus_counts(
+            decoded, ReferenceStatistics([[ref] for ref in references],
+                                         self.n), self.n)
+
+
+    def score_from_statistics(self, statistics):
+        # type: (np.ndarray) -> float
+        """Computes the score from the summed sufficient statistics."""
+        return 100 * BLEUEvaluator.bleu_from_counts(statistics, self.n)
+
+
     @staticmethod
     def ngram_counts(sentence, n, lowercase, delimiter=" "):
         # type: (List[str], int, str) -> Counter
@@ -49,6 +157,19 @@ class BLEUEvaluator(object):
         return counts
 
 
+    @staticmethod
+    def id_ngram_counts(ids, n):
+        # type: (List[int], int) -> Counter
+        """Get n-grams from a sentence of token IDs as tuples of integers
+
+        Arguments:
+            ids: Sentence as a list of token IDs
+            n: n-gram order
+        """
+        return Counter(tuple(ids[begin:begin + n])
+                       for begin in range(len(ids) - n + 1))
+
+
     @staticmethod
     def merge_max_counters(counters):
         # type: (List[Counter]) -> Counter
@@ -174,27 +295,128 @@ class BLEUEvaluator(object):
             ngram: Maximum order of n-grams. Default 4.
             case_sensitive: Perform case-sensitive computation. Default True.
         """
-        log_bleu = 0
-        weight = 1 / ngrams
+        precisions = [
+            BLEUEvaluator.modified_ngram_precision(hypotheses, references,
+                                                   order, case_sensitive)
+            for order in range(1, ngrams + 1)]
 
-        smooth = 1.0
+        # pylint: disable=invalid-name
+        # the symbols 'r', 'c' are taken from the formula in Papineni et al.
+        r = BLEUEvaluator.effective_reference_length(hypotheses, references)
+        c = sum([len(hyp) for hyp in hypotheses])
+
+        return BLEUEvaluator._combine_precisions(precisions, r, c)
+
+
+    @staticmethod
+    def bleu_with_statistics(hypotheses, statistics, ngrams=4):
+        # type: (List[List[str]], ReferenceStatistics, int) -> float
+        """Computes BLEU the same way as the ``bleu`` method (case-sensitive),
+        with the reference n-gram counts taken from the precomputed
+        statistics. Only the n-grams of the hypotheses are counted.
+
+        Arguments:
+            hypotheses: List of hypotheses
+            statistics: The statistics of the references.
+            ngrams: Maximum order of n-grams. At most the order of the
+                statistics.
+        """
+        return BLEUEvaluator.bleu_from_counts(
+            BLEUEvaluator.corpus_counts(hypotheses, statistics, ngrams),
+            ngrams)
+
+
+    @staticmethod
+    def corpus_counts(hypotheses, statistics, ngrams=4):
+        # type: (List[List[str]], ReferenceStatistics, int) -> np.ndarray
+        """Computes the counts BLEU is computed from. The counts of several
+        parts of a corpus can be summed.
+
+        Arguments:
+            hypotheses: List of hypotheses
+            statistics: The statistics of the references.
+            ngrams: Maximum order of n-grams. At most the order of the
+                statistics.
+
+        Returns:
+            Vector of the matched n-gram counts and the generated n-gram
+            counts for the orders 1 to ``ngrams``, followed by the effective
+            reference length and the length of the hypotheses.
+        """
+        if ngrams > statistics.max_order:
+            raise ValueError("The statistics contain n-grams only up to order "
+                             "{}.".format(statistics.max_order))
+
+        counts = np.zeros(2 * ngrams + 2)
+        for hypothesis, reference_counts, lengths in zip(
+                hypotheses, statistics.counts, statistics.lengths):
+            ids = statistics.token_ids(hypothesis)
+            for order in range(1, ngrams + 1):
+                hypothesis_counts = BLEUEvaluator.id_ngram_counts(ids, order)
+                counts[order - 1] += sum(reference_counts[order - 1][ngram]
+                                         for ngram in hypothesis_counts)
+                counts[ngrams + order - 1] += max(len(ids) - order + 1, 0)
+
+            # the effective reference length, i.e. the best match length
+            best_diff = np.inf
+            best_match_length = 0
+            for length in lengths:
+                if abs(length - len(hypothesis)) < best_diff:
+                    best_diff = abs(length - len(hypothesis))
+                    best_match_length = length
+            counts[2 * ngrams] += best_match_length
+            counts[2 * ngrams + 1] += len(hypothesis)
+
+        return counts
 
+
+    @staticmethod
+    def bleu_from_counts(counts, ngrams=4):
+        # type: (np.ndarray, int) -> float
+        """Computes BLEU from the counts returned by ``corpus_counts``.
+
+        Arguments:
+            counts: The (summed) counts.
+            ngrams: Maximum order of n-grams the counts were computed for.
+        """
+        precisions = []
         for order in range(1, ngrams + 1):
-            prec, gen_len = BLEUEvaluator.modified_ngram_precision(
-                hypotheses, references, order, case_sensitive)
+            generated_length = counts[ngrams + order - 1]
+            if generated_length == 0:
+                precisions.append((1, 0))
+            else:
+                precisions.append((counts[order - 1] / generated_length,
+                                   generated_length))
+
+        return BLEUEvaluator._combine_precisions(
+            precisions, counts[2 * ngrams], counts[2 * ngrams + 1])
+
+
+    @staticmethod
+    def _combine_precisions(precisions, r, c):
+        # type: (List[Tuple[float, int]], int, int) -> float
+        """Combines the modified n-gram precisions and the lengths into BLEU
+
+        Arguments:
+            precisions: List of tuples of the precision and the generated
+                length for the n-gram orders from 1.
+            r: The effective reference length.
+            c: The length of the hypotheses.
+        """
+        # pylint: disable=invalid-name
+        log_bleu = 0
+        weight = 1 / len(precisions)
+
+        smooth = 1.0
 
+        for prec, gen_len in precisions:
             if prec == 0:
                 smooth *= 2
                 prec = 1 / (smooth * gen_len)
 
             log_bleu += weight * np.log(prec)
 
-        # pylint: disable=invalid-name
-        # the symbols 'r', 'c', and 'bp' are taken from the formula in
-        # Papineni et al., it makes sense to follow the notation
-        r = BLEUEvaluator.effective_reference_length(hypotheses, references)
-        c = sum([len(hyp) for hyp in hypotheses])
-
+        # the symbol 'bp' is taken from the formula in Papineni et al.
         bp = min(1 - r/c, 0) if c != 0 else -np.inf
         log_bleu += bp
 
@@ -0,0 +1,163 @@
+"""
+This module implements the bootstrap resampling (Koehn, 2004) for computing
+the confidence intervals of the scores and the significance of the
+differences between two systems.
+
+The evaluators are only run once per sentence to get its sufficient
+statistics. The statistics of the resampled corpora are then computed at
+once as a product of the matrix of the sentence counts in the samples and the
+matrix of the sentence statistics, so no text is scored in the resampling.
+"""
+# tests: lint, mypy
+
+import numpy as np
+
+try:
+    #pylint: disable=unused-import,bare-except,invalid-name
+    from typing import Any, List, Tuple
+except:
+    pass
+
+# how many samples are processed at once, limits the size of the count matrix
+SAMPLES_CHUNK = 100
+
+
+def sentence_statistics(evaluator, decoded, references):
+    # type: (Any, List[List[str]], List[List[str]]) -> np.ndarray
+    """Computes the sufficient statistics of each sentence.
+
+    The preprocessing done by the evaluators works within the sentences
+    (e.g. the deduplication of the consecutive words in
+    ``BLEUEvaluator(deduplicate=True)``), so the statistics of the sentences
+    sum up to the statistics of the whole corpus.
+
+    Arguments:
+        evaluator: Evaluator with the ``sufficient_statistics`` and
+            ``score_from_statistics`` methods.
+        decoded: The outputs of the system.
+        references: The reference outputs.
+
+    Returns:
+        Matrix with the statistics of a sentence in each row.
+
+    Raises:
+        ValueError: If the number of the outputs and the references differ.
+    """
+    if len(decoded) != len(references):
+        raise ValueError("The number of the outputs ({}) and the references "
+                         "({}) differ.".format(len(decoded), len(references)))
+
+    return np.array([evaluator.sufficient_statistics([dec], [ref])
+                     for dec, ref in zip(decoded, references)])
+
+
+def sample_counts(sentences, samples, random_state):
+    # type: (int, int, np.random.RandomState) -> np.ndarray
+    """Draws the bootstrap samples.
+
+    Arguments:
+        sentences: The number of the sentences of the corpus.
+        samples: The number of the samples.
+        random_state: The random generator.
+
+    Returns:
+        Matrix of how many times each sentence (column) is drawn into each
+        sample (row).
+    """
+    indices = random_state.randint(0, sentences, size=(samples, sentences))
+    offsets = np.arange(samples)[:, np.newaxis] * sentences
+    return np.bincount((indices + offsets).ravel(),
+                       minlength=samples * sentences).reshape(samples,
+                                                              sentences)
+
+
+def resampled_scores(evaluator, statistics_list, samples=1000, seed=None):
+    # type: (Any, List[np.ndarray], int, int) -> List[np.ndarray]
+    """Computes the scores of the systems on the bootstrap samples.
+
+    All the systems are evaluated on the same samples, so the scores can be
+    compared pairwise.
+
+    Arguments:
+        evaluator: The evaluator the statistics were computed with.
+        statistics_list: The sentence statistics of the systems as returned
+            by ``sentence_statistics``.
+        samples: The number of the samples.
+        seed: The seed of the random generator.
+
+    Returns:
+        List of the vectors of the sample scores of the systems.
+    """
+    random_state = np.random.RandomState(seed)
+    sentences = len(statistics_list[0])
+    scores = [np.zeros(samples) for _ in statistics_list]
+
+    for start in range(0, samples, SAMPLES_CHUNK):
+        chunk = min(SAMPLES_CHUNK, samples - start)
+        counts = sample_counts(sentences, chunk, random_state)
+        for system_scores, statistics in zip(scores, statistics_list):
+            for i, sample_statistics in enumerate(counts.dot(statistics)):
+                system_scores[start + i] = evaluator.score_from_statistics(
+                    sample_statistics)
+
+    return scores
+
+
+def confidence_interval(scores, confidence=0.95):
+    # type: (np.ndarray, float) -> Tuple[float, float]
+    """Computes the confidence interval from the sample scores."""
+    tail = 100 * (1 - confidence) / 2
+    return (float(np.percentile(scores, tail)),
+            float(np.percentile(scores, 100 - tail)))
+
+
+def paired_bootstrap(evaluator, decoded_a, decoded_b, references,
+                     samples=1000, confidence=0.95, seed=None):
+    """Compares two systems using the paired bootstrap resampling.
+
+    Arguments:
+        evaluator: Evaluator supporting the sufficient statistics.
+        decoded_a: The outputs of the first system.
+        decoded_b: The outputs of the second system.
+        references: The reference outputs.
+        samples: The number of the bootstrap samples.
+        confidence: The level of the confidence intervals.
+        seed: The seed of the random generator.
+
+    Returns:
+        Dictionary with the scores of the systems on the whole corpus, their
+        confidence intervals, the fraction of samples in which the system
+        which is better on the whole corpus wins, and the p-value of the
+        hypothesis that it is not better.
+
+    Raises:
+        ValueError: If the numbers of the outputs of the systems and the
+            references differ.
+    """
+    # pylint: disable=too-many-arguments
+    if len(decoded_a) != len(decoded_b):
+        raise ValueError("The number of the outputs of the systems differ "
+                         "({} and {}).".format(len(decoded_a),
+                                               len(decoded_b)))
+
+    statistics_a = sentence_statistics(evaluator, decoded_a, references)
+    statistics_b = sentence_statistics(evaluator, decoded_b, references)
+    score_a = evaluator.score_from_statistics(statistics_a.sum(axis=0))
+    score_b = evaluator.score_from_statistics(statistics_b.sum(axis=0))
+
+    scores_a, scores_b = resampled_scores(
+        evaluator, [statistics_a, statistics_b], samples, seed)
+
+    comparisons = np.array([evaluator.compare_scores(float(a), float(b))
+                            for a, b in zip(scores_a, scores_b)])
+    if evaluator.compare_scores(float(score_a), float(score_b)) >= 0:
+        wins = np.mean(comparisons > 0)
+    else:
+        wins = np.mean(comparisons < 0)
+
+    return {"score_a": score_a,
+            "score_b": score_b,
+            "interval_a": confidence_interval(scores_a, confidence),
+            "interval_b": confidence_interval(scores_b, confidence),
+            "wins": float(wins),
+            "p_value": float(1 - wins)}
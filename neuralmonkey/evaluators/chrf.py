@@ -0,0 +1,139 @@
+#tests: lint
+
+from collections import Counter
+import numpy as np
+
+from neuralmonkey.evaluators.reference_cache import ReferenceCache
+
+try:
+    #pylint: disable=unused-import,bare-except,invalid-name
+    from typing import List
+except:
+    pass
+
+class ChrFEvaluator(object):
+    """Character n-gram F-score (chrF) of Popović (2015).
+
+    The precisions and recalls are computed from the n-gram counts of the
+    whole corpus and averaged over the n-gram orders, the same way as in
+    ``lib/subword_nmt/chrF.py``. The score is multiplied by 100, like BLEU.
+    """
+
+    def __init__(self, n=6, beta=3, ignore_whitespace=True, name=None,
+                 cache_references=True):
+        """Creates the chrF evaluator.
+
+        Arguments:
+            n: Maximum order of character n-grams.
+            beta: The weight of the recall.
+            ignore_whitespace: Whether to remove the spaces between the
+                words before extracting the n-grams.
+            name: The name of the metric.
+            cache_references: Whether to keep the n-gram counts of the few
+                most recently evaluated reference corpora, so the references
+                evaluated repeatedly (e.g. in the validation) are processed
+                only once.
+        """
+        self.n = n
+        self.beta = beta
+        self.ignore_whitespace = ignore_whitespace
+        self.cache_references = cache_references
+        self._reference_cache = ReferenceCache()
+
+        if name is not None:
+            self.name = name
+        else:
+            self.name = "chrF{:g}".format(beta)
+
+
+    def __call__(self, decoded, references):
+        # type: (List[List[str]], List[List[str]]) -> float
+        if self.cache_references:
+            reference_ngrams = self._reference_cache.get(
+                references, lambda refs: [self.ngram_counts(ref)
+                                          for ref in refs])
+        else:
+            reference_ngrams = [self.ngram_counts(ref) for ref in references]
+
+        return self.score_from_statistics(
+            self._statistics(decoded, reference_ngrams))
+
+
+    def ngram_counts(self, sentence):
+        # type: (List[str]) -> List[Counter]
+        """Counts the character n-grams of a sentence.
+
+        The n-grams are substrings, which are cheaper to create and hash
+        than tuples of characters.
+
+        Arguments:
+            sentence: Sentence as a list of words
+
+        Returns:
+            List of the counters for the n-gram orders from 1.
+        """
+        if self.ignore_whitespace:
+            chars = "".join("".join(sentence).split())
+        else:
+            chars = " ".join(sentence).strip()
+
+        return [Counter(chars[begin:begin + order]
+                        for begin in range(len(chars) - order + 1))
+                for order in range(1, self.n + 1)]
+
+
+    def _statistics(self, decoded, reference_ngrams):
+        # type: (List[List[str]], List[List[Counter]]) -> np.ndarray
+        statistics = np.zeros(3 * self.n)
+        for hypothesis, ref_counts in zip(decoded, reference_ngrams):
+            hyp_counts = self.ngram_counts(hypothesis)
+            for i in range(self.n):
+                hyp_order, ref_order = hyp_counts[i], ref_counts[i]
+                # only the shared n-grams are iterated in Python, the
+                # intersection of the keys is computed in C
+                statistics[i] += sum(
+                    min(hyp_order[ngram], ref_order[ngram])
+                    for ngram in hyp_order.keys() & ref_order.keys())
+                statistics[self.n + i] += sum(hyp_order.values())
+                statistics[2 * self.n + i] += sum(ref_order.values())
+
+        return statistics
+
+
+    def sufficient_statistics(self, decoded, references):
+        # type: (List[List[str]], List[List[str]]) -> np.ndarray
+        """Computes the matched, generated and reference n-gram counts of a
+        part of the corpus for all the n-gram orders."""
+        return self._statistics(decoded,
+                                [self.ngram_counts(ref) for ref in references])
+
+
+    def score_from_statistics(self, statistics):
+        # type: (np.ndarray) -> float
+        """Computes the score from the summed sufficient statistics."""
+        correct = statistics[:self.n]
+        total_hyp = statistics[self.n:2 * self.n]
+        total_ref = statistics[2 * self.n:]
+
+        precision = 0.0
+        recall = 0.0
+        for i in range(self.n):
+            if total_hyp[i] and total_ref[i]:
+                precision += correct[i] / total_hyp[i]
+                recall += correct[i] / total_ref[i]
+        precision /= self.n
+        recall /= self.n
+
+        if precision == 0 and recall == 0:
+            return 0.0
+
+        beta_square = self.beta ** 2
+        return 100 * ((1 + beta_square) * precision * recall /
+                      (beta_square * precision + recall))
+
+
+    @staticmethod
+    def compare_scores(score1, score2):
+        # type: (float, float) -> int
+        # the bigger the better
+        return (score1 > score2) - (score1 < score2)
@@ -1,24 +1,55 @@
 # tests: lint
 
-from difflib import SequenceMatcher
 import numpy as np
 
+try:
+    #pylint: disable=unused-import,bare-except,invalid-name
+    from typing import Any, Dict, List, Sequence
+except:
+    pass
+
 class EditDistance(object):
+    """Levenshtein distance of the outputs and the references normalized by
+    the length of the references.
+
+    The distance is computed either on the characters of the sentences
+    (joined by spaces) or on their tokens.
+    """
+
+    def __init__(self, name="Edit distance", level="character"):
+        if level not in ["character", "token"]:
+            raise ValueError("Unknown edit distance level '{}', use "
+                             "'character' or 'token'.".format(level))
 
-    def __init__(self, name="Edit distance"):
         self.name = name
+        self.level = level
 
 
     def __call__(self, decoded, references):
         # type: (List[List[str]], List[List[str]]) -> float
-        return 1 - np.mean([EditDistance.ratio(u" ".join(ref), u" ".join(dec))
-                            for dec, ref in zip(decoded, references)])
+        return EditDistance.score_from_statistics(
+            self.sufficient_statistics(decoded, references))
+
+
+    def sufficient_statistics(self, decoded, references):
+        # type: (List[List[str]], List[List[str]]) -> np.ndarray
+        """Sums the edit distances and the lengths of the references."""
+        if self.level == "character":
+            decoded = [u" ".join(dec) for dec in decoded]
+            references = [u" ".join(ref) for ref in references]
+
+        distances = corpus_levenshtein(decoded, references)
+        return np.array([np.sum(distances),
+                         sum(len(ref) for ref in references)],
+                        dtype=np.float64)
 
 
     @staticmethod
-    def ratio(str1, str2):
-        matcher = SequenceMatcher(None, str1, str2)
-        return matcher.ratio()
+    def score_from_statistics(statistics):
+        # type: (np.ndarray) -> float
+        if statistics[1] == 0:
+            return np.nan if statistics[0] == 0 else np.inf
+        return statistics[0] / statistics[1]
 
 
     @staticmethod
@@ -26,3 +57,80 @@ class EditDistance(object):
         # type: (float, float) -> int
         # the lower the better
         return (score1 < score2) - (score1 > score2)
+
+
+def levenshtein(seq1, seq2):
+    # type: (Sequence, Sequence) -> int
+    """Computes the Levenshtein distance of two sequences (strings or lists
+    of tokens) using the bit-parallel algorithm of Myers (1999) in the
+    formulation of Hyyrö (2001).
+
+    The columns of the dynamic programming matrix are encoded as the bit
+    vectors of the vertical differences between the neighbouring cells, so
+    each item of the shorter sequence is processed with a few operations on
+    integers as long as the longer sequence. Python integers are unbounded,
+    so the sequences are not split into machine words.
+    """
+    if len(seq1) < len(seq2):
+        pattern, text = seq2, seq1
+    else:
+        pattern, text = seq1, seq2
+
+    length = len(pattern)
+    if length == 0:
+        return len(text)
+
+    # the bit masks of the positions of the symbols in the pattern
+    peq = {} # type: Dict[Any, int]
+    for i, symbol in enumerate(pattern):
+        peq[symbol] = peq.get(symbol, 0) | (1 << i)
+
+    mask = (1 << length) - 1
+    last_bit = 1 << (length - 1)
+
+    # pylint: disable=invalid-name
+    # the names of the bit vectors follow the papers
+    pv = mask
+    mv = 0
+    score = length
+
+    for symbol in text:
+        eq = peq.get(symbol, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+
+        if ph & last_bit:
+            score += 1
+        elif mh & last_bit:
+            score -= 1
+
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+
+    return score
+
+
+def corpus_levenshtein(hypotheses, references):
+    # type: (List[Sequence], List[Sequence]) -> np.ndarray
+    """Computes the Levenshtein distances of the sentence pairs of a corpus.
+
+    The identical pairs, which are common in the post-editing data, are
+    skipped without running the algorithm.
+
+    Arguments:
+        hypotheses: List of the hypotheses (strings or lists of tokens).
+        references: List of the references.
+
+    Returns:
+        Vector of the distances.
+    """
+    distances = np.zeros(len(hypotheses), dtype=np.int64)
+    for i, (hyp, ref) in enumerate(zip(hypotheses, references)):
+        if hyp == ref:
+            continue
+        distances[i] = levenshtein(hyp, ref)
+    return distances
@@ -16,3 +16,15 @@ class Perplexity(object):
         are not needed at all.
         """
         return np.mean(perplexities)
+
+    @staticmethod
+    def sufficient_statistics(perplexities, _):
+        """Sums the perplexities and counts the sentences."""
+        return np.array([np.sum(perplexities), len(perplexities)],
+                        dtype=np.float64)
+
+    @staticmethod
+    def score_from_statistics(statistics):
+        if statistics[1] == 0:
+            return np.nan
+        return statistics[0] / statistics[1]
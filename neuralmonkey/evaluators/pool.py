@@ -0,0 +1,99 @@
+"""
+This module implements running the evaluators concurrently in a pool of
+processes.
+
+The evaluators are sent to the worker processes only once, when the pool is
+started, so the evaluators keeping some state between the calls (e.g. the
+cached reference statistics) keep it in the workers. For each evaluation,
+the outputs and the references are pickled only once and the same bytes are
+sent with all the tasks. Only the scores are sent back.
+"""
+# tests: lint, mypy
+
+import pickle
+import signal
+import multiprocessing
+
+try:
+    #pylint: disable=unused-import,bare-except,invalid-name
+    from typing import Tuple
+except:
+    pass
+
+# the evaluators in a worker process
+_WORKER_EVALUATORS = None
+
+
+def _init_worker(evaluators):
+    # pylint: disable=global-statement
+    global _WORKER_EVALUATORS
+    # the interruption is handled by the main process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _WORKER_EVALUATORS = evaluators
+
+
+def _evaluate(task):
+    index, payload = task
+    decoded, references = pickle.loads(payload)
+    return _WORKER_EVALUATORS[index](decoded, references)
+
+
+class EvaluatorPool(object):
+    """Runs the evaluators concurrently in worker processes.
+
+    The pool is started with the first evaluation and kept for the following
+    ones, which are expected to use the same evaluators (e.g. the periodic
+    validation). With a single process, the evaluators are run sequentially
+    in the calling process, which is also the case in the daemonic
+    processes.
+    """
+
+    def __init__(self, processes=1):
+        """Creates the pool, the processes are started lazily.
+
+        Arguments:
+            processes: The maximum number of the worker processes.
+        """
+        self.processes = processes
+        self._pool = None
+        self._evaluators = None # type: Tuple
+
+    def evaluate(self, evaluators, decoded, references):
+        """Evaluates the outputs with all the evaluators.
+
+        Arguments:
+            evaluators: List of the evaluators.
+            decoded: The postprocessed outputs.
+            references: The reference outputs.
+
+        Returns:
+            List of the scores in the order of the evaluators.
+        """
+        # a daemonic process (e.g. the asynchronous validator) is not
+        # allowed to start the worker processes
+        if (self.processes <= 1 or len(evaluators) < 2
+                or multiprocessing.current_process().daemon):
+            return [func(decoded, references) for func in evaluators]
+
+        if self._evaluators != tuple(evaluators):
+            self.close()
+            context = multiprocessing.get_context("spawn")
+            self._pool = context.Pool(min(self.processes, len(evaluators)),
+                                      initializer=_init_worker,
+                                      initargs=(list(evaluators),))
+            self._evaluators = tuple(evaluators)
+
+        payload = pickle.dumps((decoded, references),
+                               protocol=pickle.HIGHEST_PROTOCOL)
+        # map keeps the order of the tasks
+        return self._pool.map(_evaluate,
+                              [(i, payload) for i in range(len(evaluators))],
+                              chunksize=1)
+
+    def close(self):
+        """Stops the worker processes."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            self._evaluators = None
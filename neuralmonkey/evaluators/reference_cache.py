@@ -0,0 +1,58 @@
+"""
+This module implements the cache of the values precomputed from the reference
+corpora, e.g. their n-gram counts.
+
+During the training, the evaluators alternate between the references of the
+training batches and the validation references, so the cache keeps several
+of the most recently used corpora instead of only the last one.
+"""
+# tests: lint, mypy
+
+from collections import OrderedDict
+
+try:
+    #pylint: disable=unused-import,bare-except,invalid-name
+    from typing import Any, Callable, List
+except:
+    pass
+
+# how many reference corpora are kept by default
+CACHE_SIZE = 4
+
+
+class ReferenceCache(object):
+    """Least recently used cache keyed by the reference corpus."""
+
+    def __init__(self, size=CACHE_SIZE):
+        # type: (int) -> None
+        """Creates an empty cache.
+
+        Arguments:
+            size: The maximum number of the cached reference corpora.
+        """
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict() # type: OrderedDict
+
+    def get(self, references, compute):
+        # type: (List[List[str]], Callable[[List[List[str]]], Any]) -> Any
+        """Returns the value for the references, computing it if it is not
+        in the cache.
+
+        Arguments:
+            references: List of reference sentences (as lists of words)
+            compute: Function computing the value from the references.
+        """
+        key = tuple(tuple(ref) for ref in references)
+        if key in self._values:
+            self.hits += 1
+            self._values.move_to_end(key)
+            return self._values[key]
+
+        self.misses += 1
+        value = compute(references)
+        self._values[key] = value
+        if len(self._values) > self.size:
+            self._values.popitem(last=False)
+        return value
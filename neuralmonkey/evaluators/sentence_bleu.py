@@ -0,0 +1,134 @@
+"""
+This module implements the sentence-level BLEU computed for a whole batch at
+once on the arrays of the vocabulary indices, e.g. for the rewards in the
+reinforcement learning.
+
+The n-grams are hashed into 64-bit integers and the clipped counts of the
+matching n-grams are computed by comparing all pairs of the n-gram positions
+in each sentence, which is cheap for the sentence lengths used in the
+training.
+"""
+# tests: lint, mypy
+
+import numpy as np
+
+try:
+    #pylint: disable=unused-import,bare-except,invalid-name
+    from typing import Tuple
+except:
+    pass
+
+# the multiplier of the polynomial n-gram hashing (a large odd constant, the
+# multiplication wraps around modulo 2^64)
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+SMOOTHING_METHODS = ["exp", "add-one", "none"]
+
+
+def _ngram_codes(indices, lengths, order):
+    # type: (np.ndarray, np.ndarray, int) -> Tuple[np.ndarray, np.ndarray]
+    """Hashes the n-grams of the sentences.
+
+    Arguments:
+        indices: The sentences as a batch x time matrix of indices.
+        lengths: The lengths of the sentences.
+        order: The n-gram order.
+
+    Returns:
+        A tuple of a batch x positions matrix of the n-gram codes and a
+        boolean matrix of the same shape marking the n-grams within the
+        sentences.
+    """
+    positions = max(indices.shape[1] - order + 1, 0)
+    # +1 so the index zero still contributes to the hash
+    shifted = indices.astype(np.uint64) + np.uint64(1)
+
+    codes = np.zeros((indices.shape[0], positions), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for k in range(order):
+            codes = codes * _HASH_MULTIPLIER + shifted[:, k:k + positions]
+
+    valid = (np.arange(positions)[np.newaxis, :] + order
+             <= lengths[:, np.newaxis])
+    return codes, valid
+
+
+def batch_sentence_bleu(hypotheses, hypothesis_lengths, references,
+                        reference_lengths, ngrams=4, smoothing="exp"):
+    # type: (np.ndarray, np.ndarray, np.ndarray, np.ndarray, int, str)
+    #        -> np.ndarray
+    """Computes the sentence-level BLEU of each pair of sentences in a batch.
+
+    Unlike ``BLEUEvaluator.bleu``, the n-gram matches are clipped by their
+    counts in the reference, as in Papineni et al.
+
+    Arguments:
+        hypotheses: The hypotheses as a batch x time matrix of indices.
+        hypothesis_lengths: The lengths of the hypotheses.
+        references: The references as a batch x time matrix of indices. The
+            indices which must never match (e.g. unknown words) can be
+            negative.
+        reference_lengths: The lengths of the references.
+        ngrams: Maximum order of n-grams.
+        smoothing: The smoothing of the zero precisions: 'exp' (as in
+            mteval-v13a and ``BLEUEvaluator.bleu``), 'add-one' (adding one
+            to the counts of the orders higher than one, Lin and Och, 2004)
+            or 'none'.
+
+    Returns:
+        Vector of BLEU scores between 0 and 1. The score of an empty
+        hypothesis is zero.
+    """
+    # pylint: disable=too-many-locals,too-many-arguments
+    if smoothing not in SMOOTHING_METHODS:
+        raise ValueError("Unknown smoothing '{}', use one of {}."
+                         .format(smoothing, SMOOTHING_METHODS))
+
+    hypothesis_lengths = np.asarray(hypothesis_lengths)
+    reference_lengths = np.asarray(reference_lengths)
+
+    log_bleu = np.zeros(len(hypotheses))
+    smooth = np.ones(len(hypotheses))
+
+    for order in range(1, ngrams + 1):
+        hyp_codes, hyp_valid = _ngram_codes(hypotheses, hypothesis_lengths,
+                                            order)
+        ref_codes, ref_valid = _ngram_codes(references, reference_lengths,
+                                            order)
+
+        # for each n-gram in the hypothesis, its count in the hypothesis and
+        # in the reference; the occurrences of an n-gram share its clipped
+        # count equally
+        hyp_counts = np.sum((hyp_codes[:, :, np.newaxis] ==
+                             hyp_codes[:, np.newaxis, :]) &
+                            hyp_valid[:, np.newaxis, :], axis=2)
+        ref_counts = np.sum((hyp_codes[:, :, np.newaxis] ==
+                             ref_codes[:, np.newaxis, :]) &
+                            ref_valid[:, np.newaxis, :], axis=2)
+        matches = np.sum(np.where(
+            hyp_valid, np.minimum(hyp_counts, ref_counts) /
+            np.maximum(hyp_counts, 1), 0), axis=1)
+        total = np.sum(hyp_valid, axis=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if smoothing == "exp":
+                zero = (matches == 0) & (total > 0)
+                smooth = np.where(zero, 2 * smooth, smooth)
+                precision = np.where(
+                    total == 0, 1.0,
+                    np.where(zero, 1 / (smooth * np.maximum(total, 1)),
+                             matches / np.maximum(total, 1)))
+            elif smoothing == "add-one" and order > 1:
+                precision = (matches + 1) / (total + 1)
+            else:
+                precision = np.where(total == 0, 1.0,
+                                     matches / np.maximum(total, 1))
+
+            log_bleu += np.log(precision) / ngrams
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        brevity_penalty = np.minimum(
+            1 - reference_lengths / hypothesis_lengths, 0)
+
+    return np.where(hypothesis_lengths == 0, 0.0,
+                    np.exp(log_bleu + brevity_penalty))
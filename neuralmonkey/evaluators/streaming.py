@@ -0,0 +1,55 @@
+# tests: lint, mypy
+
+class StreamingEvaluator(object):
+    """Evaluates a corpus batch by batch.
+
+    The wrapped evaluator computes the sufficient statistics of each batch,
+    which are summed, so only the statistics are kept in memory and the
+    partial score is available after every batch. The final score is the
+    same as the score of the whole corpus.
+    """
+
+    def __init__(self, evaluator):
+        """Wraps an evaluator.
+
+        Arguments:
+            evaluator: Evaluator with the ``sufficient_statistics`` and
+                ``score_from_statistics`` methods.
+        """
+        if not supports_streaming(evaluator):
+            raise ValueError("Evaluator '{}' does not support the streaming "
+                             "evaluation.".format(evaluator.name))
+
+        self.evaluator = evaluator
+        self.name = evaluator.name
+        self.statistics = None
+        self.sentences = 0
+
+    def add(self, decoded, references):
+        # type: (List[List[str]], List[List[str]]) -> None
+        """Adds the statistics of a batch."""
+        batch_statistics = self.evaluator.sufficient_statistics(decoded,
+                                                                references)
+        if self.statistics is None:
+            self.statistics = batch_statistics
+        else:
+            self.statistics = self.statistics + batch_statistics
+        self.sentences += len(decoded)
+
+    def score(self):
+        # type: () -> float
+        """Returns the score of the batches added so far."""
+        if self.statistics is None:
+            raise ValueError("No batch has been added.")
+        return self.evaluator.score_from_statistics(self.statistics)
+
+    def reset(self):
+        """Forgets the added batches."""
+        self.statistics = None
+        self.sentences = 0
+
+
+def supports_streaming(evaluator):
+    """Checks whether an evaluator can be wrapped by StreamingEvaluator."""
+    return (hasattr(evaluator, "sufficient_statistics") and
+            hasattr(evaluator, "score_from_statistics"))
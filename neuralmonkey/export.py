@@ -0,0 +1,511 @@
+"""
+This module exports a trained model into a self-contained frozen graph for
+serving.
+
+In the frozen graph, the variables are folded into constants, the identity
+operations are stripped and all parts of the graph that are not needed for
+computing the tensors used by the runners are pruned. The Python objects from
+the configuration are stored along with the frozen graph in the same way as
+in the graph snapshots, so the runners and the server can load the model
+without building anything.
+
+Optionally, the decoder output projection and the word embedding matrices
+can be stored quantized into 8-bit integers with a floating point scale for
+every vocabulary item. The quantized matrices stay in 8 bits also in the
+loaded model: the embedding rows are gathered from the int8 matrix and
+scaled, and the output projection multiplies by the int8 matrix cast to
+float and scales the result.
+"""
+# tests: lint, mypy
+
+import os
+import io
+import time
+import re
+import hashlib
+import argparse
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.python.framework import graph_util, tensor_util
+
+from neuralmonkey.logging import log
+from neuralmonkey.snapshot import GraphPickler, dump_objects, load_objects
+
+try:
+    #pylint: disable=unused-import,bare-except,invalid-name
+    from typing import Dict
+except:
+    pass
+
+FROZEN_GRAPH_SUFFIX = ".pb"
+FROZEN_OBJECTS_SUFFIX = ".pickle"
+
+# the option pointing to the frozen model is usually added to the
+# configuration only after the export
+_FROZEN_MODEL_LINE = re.compile(r"^\s*frozen_model\s*=")
+
+
+class _NameCollector(GraphPickler):
+    """Pickler collecting names of the TensorFlow objects it meets."""
+
+    def __init__(self, file):
+        super().__init__(file)
+        self.names = set()
+
+    def persistent_id(self, obj):
+        pid = super().persistent_id(obj)
+        if pid is not None and pid[1] is not None:
+            self.names.add(pid[1])
+        return pid
+
+
+def referenced_nodes(objects):
+    """Returns names of graph nodes the Python objects refer to.
+
+    Arguments:
+        objects: Objects (e.g. the loaded configuration) to search through.
+    """
+    collector = _NameCollector(io.BytesIO())
+    collector.dump(objects)
+    return sorted(set(name.split(":")[0] for name in collector.names))
+
+
+def _node_name(input_name):
+    """Strips the control dependency mark and output index from an input."""
+    if input_name.startswith("^"):
+        input_name = input_name[1:]
+    return input_name.split(":")[0]
+
+
+def strip_identities(graph_def, protected_nodes):
+    """Removes the Identity operations from a graph definition and connects
+    their consumers directly to their inputs.
+
+    Arguments:
+        graph_def: The GraphDef to process.
+        protected_nodes: Names of nodes which must not be removed.
+
+    Returns:
+        A new GraphDef without the identity nodes.
+    """
+    protected_nodes = set(protected_nodes)
+    replacements = {}
+    for node in graph_def.node:
+        if (node.op == "Identity" and node.name not in protected_nodes
+                and len(node.input) == 1
+                and not node.input[0].startswith("^")):
+            replacements[node.name] = node.input[0]
+
+    def resolve(input_name):
+        control = input_name.startswith("^")
+        name = _node_name(input_name)
+
+        # only the first output of identity can be used
+        while name in replacements:
+            input_name = replacements[name]
+            name = _node_name(input_name)
+
+        if control:
+            return "^" + name
+        return input_name
+
+    stripped = tf.GraphDef()
+    for node in graph_def.node:
+        if node.name in replacements:
+            continue
+
+        new_node = stripped.node.add()
+        new_node.CopyFrom(node)
+        del new_node.input[:]
+        new_node.input.extend([resolve(i) for i in node.input])
+
+    return stripped
+
+
+def freeze_graph(sess, objects):
+    """Converts the graph of a session into a frozen graph definition.
+
+    Arguments:
+        sess: Session with the model variables loaded.
+        objects: Python objects whose tensors have to be preserved.
+
+    Returns:
+        The frozen GraphDef.
+    """
+    output_nodes = referenced_nodes(objects)
+    graph_def = sess.graph.as_graph_def()
+
+    log("Converting variables to constants.")
+    frozen = graph_util.convert_variables_to_constants(
+        sess, graph_def, output_nodes)
+    stripped = strip_identities(frozen, output_nodes)
+
+    # pruning once more removes what was needed only by the variables
+    pruned = graph_util.extract_sub_graph(stripped, output_nodes)
+    log("Frozen graph has {} nodes (the original one had {})."
+        .format(len(pruned.node), len(graph_def.node)))
+
+    return pruned
+
+
+def quantize_int8(matrix, axis):
+    """Quantizes a matrix symmetrically into 8-bit integers.
+
+    Arguments:
+        matrix: The matrix to quantize.
+        axis: The axis along which each index gets its own scale (i.e. the
+            vocabulary axis of the matrix).
+
+    Returns:
+        A tuple of the quantized int8 matrix and the float32 scales.
+    """
+    other_axis = 1 - axis
+    scales = np.max(np.abs(matrix), axis=other_axis) / 127.0
+    scales[scales == 0] = 1.0
+    scales = scales.astype(np.float32)
+
+    quantized = np.round(matrix / np.expand_dims(scales, other_axis))
+    return np.clip(quantized, -127, 127).astype(np.int8), scales
+
+
+def quantizable_matrices(args):
+    """Collects the matrices suitable for the quantization.
+
+    These are the output projection of the decoder and the word embedding
+    matrices of the decoder and the encoders.
+
+    Arguments:
+        args: Namespace with the loaded configuration.
+
+    Returns:
+        Dictionary from the variable node names to the vocabulary axes.
+    """
+    matrices = {}
+    decoder = args.decoder
+
+    if getattr(decoder, "weights", None) is not None:
+        matrices[decoder.weights.op.name] = 1
+    if getattr(decoder, "embedding_matrix", None) is not None:
+        matrices[decoder.embedding_matrix.op.name] = 0
+
+    for encoder in args.encoders:
+        if getattr(encoder, "word_embeddings", None) is not None:
+            matrices[encoder.word_embeddings.op.name] = 0
+
+    return matrices
+
+
+def _unfoldable_constant(value, name):
+    """Creates a constant which is not folded with the operations using it
+    when the graph is loaded, because it could be fed."""
+    return tf.placeholder_with_default(tf.constant(value), value.shape,
+                                       name=name)
+
+
+def _quantized_consumer(op, dequantized, quantized, scales, axis):
+    """Creates an operation computing the output of an operation using a
+    quantized matrix directly from the int8 values, or returns None if the
+    operation cannot be computed this way.
+
+    Arguments:
+        op: The operation using the dequantized matrix.
+        dequantized: The dequantized matrix.
+        quantized: The int8 matrix.
+        scales: The float scales of the vocabulary items.
+        axis: The vocabulary axis of the matrix.
+    """
+    if op.type == "Gather" and op.inputs[0] == dequantized and axis == 0:
+        # only the gathered rows are converted to float
+        indices = op.inputs[1]
+        rows = tf.to_float(tf.gather(quantized, indices))
+        return tf.mul(rows, tf.expand_dims(tf.gather(scales, indices), -1),
+                      name=op.name + "_quantized")
+
+    if op.type == "MatMul" and op.inputs[1] == dequantized:
+        # the columns of the product correspond to the vocabulary items
+        transpose_b = op.get_attr("transpose_b")
+        if axis == (0 if transpose_b else 1):
+            product = tf.matmul(op.inputs[0], tf.to_float(quantized),
+                                transpose_a=op.get_attr("transpose_a"),
+                                transpose_b=transpose_b)
+            return tf.mul(product, scales, name=op.name + "_quantized")
+
+    return None
+
+
+def _replace_inputs(graph_def, replacements):
+    """Connects the consumers of the replaced nodes to their replacements.
+
+    Arguments:
+        graph_def: The graph definition.
+        replacements: Dictionary from the names of the replaced nodes to the
+            names of the nodes replacing them (all with a single output).
+    """
+    for node in graph_def.node:
+        for i, input_name in enumerate(node.input):
+            name = _node_name(input_name)
+            if name in replacements:
+                prefix = "^" if input_name.startswith("^") else ""
+                node.input[i] = prefix + replacements[name]
+
+
+def quantize_graph(sess, graph_def, matrices, output_nodes):
+    """Replaces the given matrices in a frozen graph by their quantized
+    versions.
+
+    The operations gathering the rows of the matrices and multiplying by
+    them work directly with the int8 values and the scales. The other
+    operations get the matrix dequantized on the fly. The int8 matrices are
+    hidden behind ``placeholder_with_default``, so TensorFlow does not fold
+    them back into float32 constants when the graph is loaded.
+
+    Arguments:
+        sess: Session with the model variables loaded.
+        graph_def: The frozen graph definition.
+        matrices: Dictionary from the variable node names to the vocabulary
+            axes of the matrices.
+        output_nodes: Names of nodes which have to be preserved.
+
+    Returns:
+        The quantized GraphDef.
+    """
+    values = sess.run([sess.graph.get_tensor_by_name(name + ":0")
+                       for name in matrices])
+
+    # pylint: disable=too-many-locals
+    with tf.Graph().as_default() as graph:
+        input_map = {}
+        quantized_tensors = {}
+        for (name, axis), matrix in zip(matrices.items(), values):
+            quantized, scales = quantize_int8(matrix, axis)
+            log("Quantizing {} {} into int8.".format(name, matrix.shape))
+
+            quantized_tensor = _unfoldable_constant(quantized, name + "_int8")
+            scales_tensor = _unfoldable_constant(scales, name + "_scales")
+            quantized_tensors[name] = (quantized_tensor, scales_tensor, axis)
+
+            # used by the operations which cannot use the int8 values
+            dequantized = tf.mul(
+                tf.to_float(quantized_tensor),
+                tf.expand_dims(scales_tensor, 1 - axis),
+                name=name + "_dequantized")
+            input_map[name + ":0"] = dequantized
+
+        tf.import_graph_def(graph_def, input_map=input_map, name="")
+
+        replacements = {}
+        for name, (quantized_tensor, scales_tensor, axis) in \
+                quantized_tensors.items():
+            dequantized = input_map[name + ":0"]
+            for op in dequantized.consumers():
+                if op.name in output_nodes:
+                    continue
+                replacement = _quantized_consumer(
+                    op, dequantized, quantized_tensor, scales_tensor, axis)
+                if replacement is not None:
+                    replacements[op.name] = replacement.op.name
+
+    quantized_def = graph.as_graph_def()
+    _replace_inputs(quantized_def, replacements)
+    log("{} operation(s) use the int8 matrices directly."
+        .format(len(replacements)))
+
+    # the original float matrices must not stay in the graph
+    kept_nodes = [n for n in output_nodes if n not in matrices]
+    return graph_util.extract_sub_graph(quantized_def, kept_nodes)
+
+
+def frozen_config_hash(ini_file):
+    """Computes a hash of a configuration file ignoring the line with the
+    ``frozen_model`` option.
+
+    Arguments:
+        ini_file: Path to the configuration file.
+    """
+    digest = hashlib.sha1()
+    with open(ini_file, 'rb') as f_ini:
+        for line in f_ini:
+            if not _FROZEN_MODEL_LINE.match(line.decode("utf-8")):
+                digest.update(line)
+    return digest.hexdigest()
+
+
+def constant_bytes(graph_def):
+    """Computes the sizes of the constants stored in a graph definition.
+
+    Arguments:
+        graph_def: The graph definition.
+
+    Returns:
+        Dictionary from the names of the data types to the total sizes of
+        the constants in bytes.
+    """
+    sizes = {} # type: Dict[str, int]
+    for node in graph_def.node:
+        if node.op == "Const":
+            value = tensor_util.MakeNdarray(node.attr["value"].tensor)
+            sizes[value.dtype.name] = (sizes.get(value.dtype.name, 0)
+                                       + value.nbytes)
+    return sizes
+
+
+def save_frozen_model(prefix, graph_def, args, ini_file):
+    """Writes the frozen graph and the configuration objects.
+
+    Arguments:
+        prefix: Path prefix of the created files.
+        graph_def: The frozen graph definition.
+        args: Namespace with the configuration built on the frozen graph.
+        ini_file: The configuration file the model was built from.
+    """
+    with open(prefix + FROZEN_GRAPH_SUFFIX, 'wb') as f_graph:
+        f_graph.write(graph_def.SerializeToString())
+    dump_objects(prefix + FROZEN_OBJECTS_SUFFIX, args,
+                 config_hash=frozen_config_hash(ini_file))
+
+    log("Frozen model saved to {}{}".format(prefix, FROZEN_GRAPH_SUFFIX))
+
+
+def load_frozen_model(prefix, ini_file, threads):
+    """Imports a frozen model into the default graph.
+
+    Arguments:
+        prefix: Path prefix of the frozen model files.
+        ini_file: The configuration file the model is loaded for. It must be
+            the same as the one the model was exported with, except for the
+            ``frozen_model`` option.
+        threads: Number of threads used by the TensorFlow session.
+
+    Returns:
+        A tuple of the configuration namespace and a new TensorFlow session.
+    """
+    log("Loading frozen model from {}{}".format(prefix, FROZEN_GRAPH_SUFFIX))
+    graph_def = tf.GraphDef()
+    with open(prefix + FROZEN_GRAPH_SUFFIX, 'rb') as f_graph:
+        graph_def.ParseFromString(f_graph.read())
+
+    tf.import_graph_def(graph_def, name="")
+    # the parts of the model not needed for running were pruned
+    info, args = load_objects(prefix + FROZEN_OBJECTS_SUFFIX,
+                              allow_missing=True)
+
+    if info.get("config_hash") != frozen_config_hash(ini_file):
+        raise ValueError("Frozen model {} was exported with a different "
+                         "configuration than {}.".format(prefix, ini_file))
+
+    sess = tf.Session(config=tf.ConfigProto(
+        inter_op_parallelism_threads=threads,
+        intra_op_parallelism_threads=threads))
+
+    return args, sess
+
+
+def _variable_bytes(graph):
+    """Computes the total size of the variables of a graph in bytes."""
+    with graph.as_default():
+        return sum(v.get_shape().num_elements() * v.dtype.base_dtype.size
+                   for v in tf.all_variables())
+
+
+def _timed_run(sess, args, dataset):
+    """Runs a model on a dataset and measures the time per sentence.
+
+    Returns:
+        A tuple of the evaluation and the time per sentence in seconds.
+    """
+    from neuralmonkey.learning_utils import run_on_dataset
+
+    start = time.time()
+    _, _, evaluation = run_on_dataset(
+        sess, args.runner, args.encoders + [args.decoder], args.decoder,
+        dataset, args.evaluation, args.postprocess)
+    return evaluation, (time.time() - start) / max(1, len(dataset))
+
+
+def evaluate_exported(args, sess, exported_prefix, ini_file, datasets):
+    """Compares the evaluation, the speed and the memory of the parameters of
+    the original and the exported model.
+
+    This is used for measuring the loss of quality and the gain in speed and
+    memory caused by the quantization.
+
+    Arguments:
+        args: Namespace with the configuration of the original model.
+        sess: Session with the original model.
+        exported_prefix: Path prefix of the exported model.
+        ini_file: The configuration file the model was exported with.
+        datasets: Datasets to evaluate both models on.
+    """
+    original_bytes = _variable_bytes(sess.graph)
+    original_runs = [_timed_run(sess, args, dataset) for dataset in datasets]
+
+    # the runners may add operations to the graph of the evaluated model
+    with tf.Graph().as_default() as graph:
+        exported_args, exported_sess = load_frozen_model(
+            exported_prefix, ini_file, args.threads)
+        exported_bytes = sum(constant_bytes(graph.as_graph_def()).values())
+        log("Parameter memory: original {:.1f} MB, exported {:.1f} MB"
+            .format(original_bytes / 1024 ** 2, exported_bytes / 1024 ** 2))
+
+        for dataset, (evaluation, latency) in zip(datasets, original_runs):
+            exported_evaluation, exported_latency = _timed_run(
+                exported_sess, exported_args, dataset)
+
+            log("Time per sentence on \"{}\": original {:.2f} ms, "
+                "exported {:.2f} ms".format(dataset.name, latency * 1000,
+                                            exported_latency * 1000))
+            for evaluator in args.evaluation:
+                original = evaluation[evaluator.name]
+                exported = exported_evaluation[evaluator.name]
+                log("{} on \"{}\": original {:.4f}, exported {:.4f}, "
+                    "delta {:+.4f}".format(evaluator.name, dataset.name,
+                                           original, exported,
+                                           exported - original))
+
+
+def main():
+    # pylint: disable=no-member
+    from neuralmonkey.run import initialize_for_running
+    from neuralmonkey.config.configuration import Configuration
+
+    parser = argparse.ArgumentParser(
+        description="Exports a trained model into a frozen graph.")
+    parser.add_argument("configuration", type=str,
+                        help="Configuration file used for running the model.")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Path prefix of the exported files. Defaults to "
+                        "'frozen_model' in the experiment directory.")
+    parser.add_argument("--quantize", action="store_true",
+                        help="Store the output projection and the word "
+                        "embeddings as 8-bit integers, also in the memory "
+                        "of the loaded model.")
+    parser.add_argument("--evaluate", type=str, default=None,
+                        help="Configuration file with test datasets on "
+                        "which the exported model is compared with the "
+                        "original one.")
+    cli_args = parser.parse_args()
+
+    print("")
+    args, sess = initialize_for_running(cli_args.configuration,
+                                        use_frozen=False)
+
+    prefix = cli_args.output
+    if prefix is None:
+        prefix = os.path.join(args.output, "frozen_model")
+
+    graph_def = freeze_graph(sess, args)
+    if cli_args.quantize:
+        graph_def = quantize_graph(sess, graph_def, quantizable_matrices(args),
+                                   referenced_nodes(args))
+    log("Stored constants: {}".format(", ".join(
+        "{} {:.1f} MB".format(dtype, size / 1024 ** 2)
+        for dtype, size in sorted(constant_bytes(graph_def).items()))))
+    save_frozen_model(prefix, graph_def, args, cli_args.configuration)
+
+    if cli_args.evaluate:
+        test_datasets = Configuration()
+        test_datasets.add_argument('test_datasets')
+        datasets_args = test_datasets.load_file(cli_args.evaluate)
+        evaluate_exported(args, sess, prefix, cli_args.configuration,
+                          datasets_args.test_datasets)
@@ -3,11 +3,23 @@
 import os
 import codecs
 import re
+import time
+import inspect
+import random
+import itertools
+import weakref
 import numpy as np
 import tensorflow as tf
 from termcolor import colored
 
 from neuralmonkey.logging import log, log_print
+from neuralmonkey.build_mode import is_inference_only
+from neuralmonkey.async_validation import AsyncValidator
+from neuralmonkey.checkpointing import CheckpointWriter, AsyncCheckpointWriter
+from neuralmonkey.profiling import StepTimer, NoStepTimer, TracingSession
+from neuralmonkey.evaluators.streaming import StreamingEvaluator, \
+    supports_streaming
+from neuralmonkey.evaluators.pool import EvaluatorPool
 
 try:
     #pylint: disable=unused-import,bare-except,invalid-name,import-error,no-member
@@ -50,6 +62,111 @@ def feed_dicts(dataset, coders, train=False):
     return res
 
 
+def _feed_dict_bytes(feed_dict):
+    """Estimates the memory occupied by the values of a feed dictionary."""
+    return sum(np.asarray(value).nbytes for value in feed_dict.values())
+
+
+class FeedDictCache(object):
+    """Cache of the feed dictionaries of datasets which do not change
+    between runs, such as the validation dataset.
+
+    The entries are dropped together with the datasets they were created
+    for. The feed dictionaries are created lazily, batch by batch; when the
+    memory cap is exceeded, the rest of the batches are only streamed and the
+    dataset is not cached.
+    """
+
+    def __init__(self, max_bytes):
+        """Creates a new cache.
+
+        Arguments:
+            max_bytes: The maximum size of the cached values in bytes.
+        """
+        self.max_bytes = max_bytes
+        self._cache = weakref.WeakKeyDictionary()
+
+    def size(self):
+        """Returns the size of the cached values in bytes."""
+        return sum(size for entries in self._cache.values()
+                   for _, size in entries.values())
+
+    def get(self, dataset, coders, batch_size):
+        """Returns the feed dictionaries of the dataset batches for running
+        the model (i.e. not for training).
+
+        Arguments:
+            dataset: The dataset to be batched.
+            coders: The encoders and decoders to feed the data.
+            batch_size: Size of the batches.
+
+        Returns:
+            The list of the cached feed dictionaries or a generator creating
+            them batch by batch.
+        """
+        key = (batch_size, tuple(id(c) for c in coders))
+        entries = self._cache.get(dataset)
+        if entries is not None and key in entries:
+            return entries[key][0]
+
+        return self._generate(dataset, coders, batch_size, key)
+
+    def _generate(self, dataset, coders, batch_size, key):
+        free_bytes = self.max_bytes - self.size()
+        dicts = [] # type: List[Feed_dict]
+        size = 0
+
+        for batch in dataset.batch_dataset(batch_size):
+            feed_dict = feed_dicts(batch, coders, train=False)
+            if dicts is not None:
+                size += _feed_dict_bytes(feed_dict)
+                if size <= free_bytes:
+                    dicts.append(feed_dict)
+                else:
+                    # over the cap, the dataset will not be cached
+                    dicts = None
+            yield feed_dict
+
+        if dicts is not None:
+            self._cache.setdefault(dataset, {})[key] = (dicts, size)
+
+
+# pylint: disable=invalid-name
+# the cache is shared by the runners
+feed_dict_cache = FeedDictCache(256 * 1024 * 1024)
+
+
+def cached_feed_dicts(dataset, coders, batch_size):
+    """Returns the (possibly cached) feed dictionaries of the batches of
+    a dataset. The returned dictionaries must not be modified.
+
+    Arguments:
+        dataset: The dataset to be batched.
+        coders: The encoders and decoders to feed the data.
+        batch_size: Size of the batches.
+    """
+    return feed_dict_cache.get(dataset, coders, batch_size)
+
+
+def streamed_feed_dicts(dataset, coders, batch_size):
+    """Creates the feed dictionaries of the batches of a dataset one by one,
+    without caching them.
+
+    Arguments:
+        dataset: The dataset to be batched.
+        coders: The encoders and decoders to feed the data.
+        batch_size: Size of the batches.
+    """
+    for batch in dataset.batch_dataset(batch_size):
+        yield feed_dicts(batch, coders, train=False)
+
+
+# pylint: disable=invalid-name
+# the pool is shared by all the evaluations, by default it runs the
+# evaluators sequentially
+evaluator_pool = EvaluatorPool()
+
+
 def get_eval_string(evaluators, evaluation_res):
     """ Formats the external evaluation metric for the console output. """
     eval_string = "    ".join(["{}: {:.2f}".format(f.name,
@@ -83,9 +200,14 @@ def initialize_tf(initial_variables, threads):
     log("Initializing the TensorFlow session.")
     sess = tf.Session(config=tf.ConfigProto(inter_op_parallelism_threads=threads,
                                             intra_op_parallelism_threads=threads))
-    sess.run(tf.initialize_all_variables())
 
-    saver = tf.train.Saver()
+    # inference-only graphs contain just the variables of the runtime path,
+    # all of them are in the checkpoint, so there is no need to initialize
+    # them before the restore
+    if not (initial_variables and is_inference_only()):
+        sess.run(tf.initialize_all_variables())
+
+    saver = tf.train.Saver(tf.all_variables())
     if initial_variables:
         log("Loading variables from {}".format(initial_variables))
         saver.restore(sess, initial_variables)
@@ -108,7 +230,16 @@ def training_loop(sess, saver,
                   logging_period=20,
                   validation_period=500,
                   postprocess=None,
-                  minimize_metric=False):
+                  minimize_metric=False,
+                  async_validation_ini=None,
+                  log_from_train_step=False,
+                  parallel_trainer=None,
+                  async_checkpoints=False,
+                  resume_state=None,
+                  save_resume_checkpoints=False,
+                  step_timing=False,
+                  trace_period=0,
+                  trace_validation_period=0):
 
     """
     Performs the training loop for given graph and data.
@@ -147,6 +278,44 @@ def training_loop(sess, saver,
         initial_variables: Either None or file where the variables are stored.
             Training then starts from the point the loaded values.
 
+        async_validation_ini: Either None or the configuration file from
+            which a separate validator process builds the model. If provided,
+            the validation runs in that process on saved checkpoints and the
+            training does not wait for it.
+
+        log_from_train_step: Flag whether the outputs and losses logged on
+            the training batches are computed in the same run as the
+            optimization step (i.e. with dropout) instead of running the
+            model on the batch again. The run does not order the fetches
+            with respect to the update, so the logged values may come from
+            the variables before or after the update.
+
+        parallel_trainer: Either None or the DataParallelTrainer which runs
+            the training steps on several local processes.
+
+        async_checkpoints: Flag whether the variables are written to disk
+            in a background thread from an in-memory snapshot.
+
+        resume_state: Either None or the training state stored with the
+            checkpoint given as ``initial_variables``. The training then
+            continues with the first batch not seen before the checkpoint.
+
+        save_resume_checkpoints: Flag whether the latest variables and the
+            training state are saved with every validation, so the training
+            can be resumed later.
+
+        step_timing: Flag whether the durations of the phases of the training
+            steps and the throughput are measured and reported every logging
+            period.
+
+        trace_period: If positive, every ``trace_period``-th training step
+            is run with the full tracing and the traces are written to the
+            ``traces`` subdirectory of the log directory.
+
+        trace_validation_period: If positive, every
+            ``trace_validation_period``-th validation is traced (only
+            without the asynchronous validation).
+
     """
 
     if not postprocess:
@@ -155,6 +324,24 @@ def training_loop(sess, saver,
     evaluation_labels = [f.name for f in evaluators]
     step = 0
     seen_instances = 0
+    start_epoch = 0
+    skip_batches = 0
+
+    if resume_state is not None:
+        step = resume_state["step"]
+        seen_instances = resume_state["seen_instances"]
+        start_epoch = resume_state["epoch"]
+        skip_batches = resume_state["batch"]
+
+        if resume_state["permutation"] is not None:
+            train_dataset.permute(resume_state["permutation"])
+        random.setstate(resume_state["random_state"])
+        np.random.set_state(resume_state["numpy_random_state"])
+
+        log("Resuming training in epoch {} from batch number {}"
+            .format(start_epoch + 1, skip_batches))
+
+    last_vars_file = "{}.last".format(vars_prefix)
 
     saver = tf.train.Saver()
 
@@ -177,12 +364,19 @@ def training_loop(sess, saver,
         saved_scores = [-np.inf for _ in range(save_n_best_vars)]
         best_score = -np.inf
 
-    saver.save(sess, variables_files[0])
+    timer = StepTimer() if step_timing else NoStepTimer()
+    trace_directory = None
+    if log_directory and (trace_period > 0 or trace_validation_period > 0):
+        trace_directory = os.path.join(log_directory, "traces")
+    validations = 0
 
-    if os.path.islink(link_best_vars):
-        # if overwriting output dir
-        os.unlink(link_best_vars)
-    os.symlink(os.path.basename(variables_files[0]), link_best_vars)
+    if async_checkpoints:
+        checkpoint_writer = AsyncCheckpointWriter()
+    else:
+        checkpoint_writer = CheckpointWriter(saver)
+
+    # the link is replaced if overwriting output dir
+    checkpoint_writer.save(sess, variables_files[0], link_best_vars)
 
     if log_directory:
         log("Initializing TensorBoard summary writer.")
@@ -195,37 +389,145 @@ def training_loop(sess, saver,
     val_raw_tgt_sentences = val_dataset.get_series(decoder.data_id)
     val_tgt_sentences = postprocess(val_raw_tgt_sentences)
 
+    validator = None
+    if async_validation_ini:
+        validator = AsyncValidator(async_validation_ini, variables_files,
+                                   link_best_vars, minimize_metric)
+
     log("Starting training")
+    # the throughput is measured on the training steps since the last log,
+    # without the time spent on the logging, validation and checkpoints
+    window_instances = 0
+    window_time = 0.0
+    workers = parallel_trainer.workers if parallel_trainer else 1
     try:
-        for i in range(epochs):
+        for i in range(start_epoch, epochs):
             log_print("")
             log("Epoch {} starts".format(i + 1), color='red')
 
-            train_dataset.shuffle()
-            train_batched_datasets = train_dataset.batch_dataset(batch_size)
+            # the resumed epoch continues with the restored data order
+            if skip_batches == 0:
+                train_dataset.shuffle()
+            train_batched_datasets = timer.timed_iter(
+                "batch", itertools.islice(
+                    train_dataset.batch_dataset(batch_size), skip_batches,
+                    None))
 
-            for batch_n, batch_dataset in enumerate(train_batched_datasets):
+            step_start = time.time()
+            for batch_n, batch_dataset in enumerate(train_batched_datasets,
+                                                    skip_batches):
 
-                batch_feed_dict = feed_dicts(batch_dataset, all_coders, train=True)
                 step += 1
                 batch_sentences = batch_dataset.get_series(decoder.data_id)
                 seen_instances += len(batch_sentences)
-                if step % logging_period == logging_period - 1:
-                    summary_str = trainer.run(sess, batch_feed_dict, summary=True)
-                    _, _, train_evaluation = \
-                            run_on_dataset(sess, runner, all_coders, decoder, batch_dataset,
-                                           evaluators, postprocess, write_out=False)
+                is_logging_step = step % logging_period == logging_period - 1
+                train_evaluation = None
+
+                if (trace_directory is not None and trace_period > 0
+                        and step % trace_period == 0):
+                    step_sess = TracingSession(sess)
+                else:
+                    step_sess = sess
+
+                if parallel_trainer is not None:
+                    with timer.phase("train"):
+                        step_summary = parallel_trainer.run(
+                            step_sess, batch_dataset, all_coders,
+                            summary=is_logging_step)
+                    if is_logging_step:
+                        summary_str = step_summary
+                elif is_logging_step and log_from_train_step:
+                    with timer.phase("feed_dict"):
+                        batch_feed_dict = feed_dicts(batch_dataset,
+                                                     all_coders, train=True)
+                    with timer.phase("train"):
+                        summary_str, fetched = trainer.run(
+                            step_sess, batch_feed_dict, summary=True,
+                            fetches=runner.batch_fetches(True))
+                    decoded_raw, opt_loss, dec_loss = \
+                        runner.process_fetched(fetched)
+                    _, train_evaluation = evaluate_result(
+                        decoded_raw, opt_loss, dec_loss, batch_dataset,
+                        decoder, evaluators, postprocess)
+                else:
+                    with timer.phase("feed_dict"):
+                        batch_feed_dict = feed_dicts(batch_dataset,
+                                                     all_coders, train=True)
+                    with timer.phase("train"):
+                        if is_logging_step:
+                            summary_str = trainer.run(step_sess,
+                                                      batch_feed_dict,
+                                                      summary=True)
+                        else:
+                            trainer.run(step_sess, batch_feed_dict,
+                                        summary=False)
+
+                timer.step(batch_sentences)
+                window_instances += len(batch_sentences)
+                window_time += time.time() - step_start
+
+                if step_sess is not sess:
+                    step_sess.write(trace_directory, "step-{}".format(step))
+
+                if is_logging_step:
+                    if train_evaluation is None:
+                        _, _, train_evaluation = \
+                                run_on_dataset(sess, runner, all_coders, decoder, batch_dataset,
+                                               evaluators, postprocess, write_out=False)
 
                     process_evaluation(evaluators, tb_writer, train_evaluation,
                                        seen_instances, summary_str, None, train=True)
-                else:
-                    trainer.run(sess, batch_feed_dict, summary=False)
 
-                if step % validation_period == validation_period - 1:
-                    decoded_val_sentences, decoded_raw_val_sentences, \
-                        val_evaluation = run_on_dataset(
-                            sess, runner, all_coders, decoder, val_dataset,
-                            evaluators, postprocess, write_out=False)
+                    log("Throughput: {:.1f} sentences per second ({} "
+                        "worker(s))".format(window_instances / window_time,
+                                            workers))
+                    window_instances = 0
+                    window_time = 0.0
+                    timer.report(tb_writer, seen_instances)
+
+                if (save_resume_checkpoints
+                        and step % validation_period == validation_period - 1):
+                    # the checkpoint for resuming the training is written in
+                    # the background while the validation runs
+                    with timer.phase("checkpoint"):
+                        checkpoint_writer.save(
+                            sess, last_vars_file,
+                            state=_training_state(step, seen_instances, i,
+                                                  batch_n + 1, train_dataset))
+
+                if validator is not None:
+                    for result in validator.poll():
+                        best_score, best_score_epoch, best_score_batch_no = \
+                            _process_async_validation(
+                                result, evaluators, tb_writer, best_score,
+                                best_score_epoch, best_score_batch_no,
+                                minimize_metric)
+
+                    if step % validation_period == validation_period - 1:
+                        with timer.phase("checkpoint"):
+                            validator.submit(sess, saver, vars_prefix,
+                                             epoch=i + 1, batch_n=batch_n,
+                                             seen_instances=seen_instances)
+
+                elif step % validation_period == validation_period - 1:
+                    validations += 1
+                    if (trace_directory is not None
+                            and trace_validation_period > 0
+                            and validations % trace_validation_period == 0):
+                        val_sess = TracingSession(sess)
+                    else:
+                        val_sess = sess
+
+                    with timer.phase("validation"):
+                        decoded_val_sentences, decoded_raw_val_sentences, \
+                            val_evaluation = run_on_dataset(
+                                val_sess, runner, all_coders, decoder,
+                                val_dataset, evaluators, postprocess,
+                                write_out=False)
+
+                    if val_sess is not sess:
+                        val_sess.write(trace_directory,
+                                       "validation-{}".format(step))
 
                     this_score = val_evaluation[evaluators[-1].name]
 
@@ -252,15 +554,15 @@ def training_loop(sess, saver,
                     if is_better(this_score, worst_score, minimize_metric):
                         # we need to save this score instead the worst score
                         worst_var_file = variables_files[worst_index]
-                        saver.save(sess, worst_var_file)
+                        # the symlink is updated after the file is written
+                        with timer.phase("checkpoint"):
+                            checkpoint_writer.save(
+                                sess, worst_var_file,
+                                link_best_vars if best_score == this_score
+                                else None)
                         saved_scores[worst_index] = this_score
                         log("Variable file saved in {}".format(worst_var_file))
 
-                        # update symlink
-                        if best_score == this_score:
-                            os.unlink(link_best_vars)
-                            os.symlink(os.path.basename(worst_var_file), link_best_vars)
-
                         log("Best scores saved so far: {}".format(saved_scores))
 
                     log("Validation (epoch {}, batch number {}):"
@@ -283,35 +585,30 @@ def training_loop(sess, saver,
                         color='blue')
 
 
-                    log_print("")
-                    log_print("Examples:")
-                    for sent, sent_raw, ref_sent, ref_sent_raw in zip(
-                            decoded_val_sentences[:15],
-                            decoded_raw_val_sentences,
-                            val_tgt_sentences,
-                            val_raw_tgt_sentences):
-
-                        if isinstance(sent, list):
-                            log_print("      raw: {}"
-                                      .format(" ".join(sent_raw)))
-                            log_print("      out: {}".format(" ".join(sent)))
-                        else:
-                            # TODO does this code ever execute?
-                            log_print(sent_raw)
-                            log_print(sent)
+                    print_examples(zip(decoded_val_sentences[:15],
+                                       decoded_raw_val_sentences,
+                                       val_tgt_sentences,
+                                       val_raw_tgt_sentences))
 
-                        log_print(colored(
-                            " raw ref.: {}".format(" ".join(ref_sent_raw)),
-                            color="magenta"))
-                        log_print(colored(
-                            "     ref.: {}".format(" ".join(ref_sent)),
-                            color="magenta"))
+                step_start = time.time()
 
-                    log_print("")
+            skip_batches = 0
 
     except KeyboardInterrupt:
         log("Training interrupted by user.")
 
+    if parallel_trainer is not None:
+        parallel_trainer.finish()
+
+    if validator is not None:
+        for result in validator.finish():
+            best_score, best_score_epoch, best_score_batch_no = \
+                _process_async_validation(
+                    result, evaluators, tb_writer, best_score,
+                    best_score_epoch, best_score_batch_no, minimize_metric)
+
+    checkpoint_writer.wait()
+
     if os.path.islink(link_best_vars):
         saver.restore(sess, link_best_vars)
 
@@ -328,6 +625,101 @@ def training_loop(sess, saver,
     log("Finished.")
 
 
+def _training_state(step, seen_instances, epoch, batch, train_dataset):
+    """Collects the state of the training loop needed for resuming the
+    training exactly where it stopped.
+
+    Arguments:
+        step: Number of the performed training steps.
+        seen_instances: Number of the processed training instances.
+        epoch: The current epoch (counted from zero).
+        batch: Number of the first batch of the epoch not processed yet.
+        train_dataset: The training dataset in its current order.
+    """
+    return {"step": step,
+            "seen_instances": seen_instances,
+            "epoch": epoch,
+            "batch": batch,
+            "permutation": train_dataset.permutation,
+            "random_state": random.getstate(),
+            "numpy_random_state": np.random.get_state()}
+
+
+def print_examples(examples):
+    """Prints the examples of the decoded validation sentences.
+
+    Arguments:
+        examples: Iterable of tuples of a decoded sentence, the raw decoded
+            sentence, the reference and the raw reference.
+    """
+    log_print("")
+    log_print("Examples:")
+    for sent, sent_raw, ref_sent, ref_sent_raw in examples:
+
+        if isinstance(sent, list):
+            log_print("      raw: {}"
+                      .format(" ".join(sent_raw)))
+            log_print("      out: {}".format(" ".join(sent)))
+        else:
+            # TODO does this code ever execute?
+            log_print(sent_raw)
+            log_print(sent)
+
+        log_print(colored(
+            " raw ref.: {}".format(" ".join(ref_sent_raw)),
+            color="magenta"))
+        log_print(colored(
+            "     ref.: {}".format(" ".join(ref_sent)),
+            color="magenta"))
+
+    log_print("")
+
+
+def _process_async_validation(result, evaluators, tb_writer, best_score,
+                              best_score_epoch, best_score_batch_no,
+                              minimize_metric):
+    """Logs a result received from the validator process.
+
+    Returns:
+        The updated tuple of the best score, its epoch and batch number.
+    """
+    # pylint: disable=too-many-arguments
+    if "error" in result:
+        log("Validation of {} failed:\n{}"
+            .format(result["checkpoint"], result["error"]), color='red')
+        return best_score, best_score_epoch, best_score_batch_no
+
+    this_score = result["evaluation"][evaluators[-1].name]
+    if ((minimize_metric and this_score < best_score)
+            or (not minimize_metric and this_score > best_score)):
+        best_score = this_score
+        best_score_epoch = result["epoch"]
+        best_score_batch_no = result["batch_n"]
+
+    if result["saved_to"] is not None:
+        log("Variable file saved in {}".format(result["saved_to"]))
+        log("Best scores saved so far: {}".format(result["saved_scores"]))
+
+    log("Validation (epoch {}, batch number {}):"
+        .format(result["epoch"], result["batch_n"]), color='blue')
+
+    process_evaluation(evaluators, tb_writer, result["evaluation"],
+                       result["seen_instances"], None, None, train=False)
+
+    if this_score == best_score:
+        best_score_str = colored("{:.2f}".format(best_score), attrs=['bold'])
+    else:
+        best_score_str = "{:.2f}".format(best_score)
+
+    log("best {} on validation: {} (in epoch {}, after batch number {})"
+        .format(evaluators[-1].name, best_score_str, best_score_epoch,
+                best_score_batch_no), color='blue')
+
+    print_examples(result["examples"])
+
+    return best_score, best_score_epoch, best_score_batch_no
+
+
 def run_on_dataset(sess, runner, all_coders, decoder, dataset,
                    evaluators, postprocess, write_out=False):
     """
@@ -360,10 +752,9 @@ def run_on_dataset(sess, runner, all_coders, decoder, dataset,
 
     """
     result_raw, opt_loss, dec_loss = runner(sess, dataset, all_coders)
-    if postprocess is not None:
-        result = postprocess(result_raw)
-    else:
-        result = result_raw
+    result, evaluation = evaluate_result(result_raw, opt_loss, dec_loss,
+                                         dataset, decoder, evaluators,
+                                         postprocess)
 
     if write_out:
         if decoder.data_id in dataset.series_outputs:
@@ -379,15 +770,143 @@ def run_on_dataset(sess, runner, all_coders, decoder, dataset,
             log("There is no output file for dataset: {}"\
                     .format(dataset.name), color='red')
 
+    return result, result_raw, evaluation
+
+
+def can_evaluate_streaming(runner, decoder, dataset, evaluators):
+    """Checks whether the dataset can be evaluated with
+    ``evaluate_streaming``, i.e. the runner produces the results batch by
+    batch, all the evaluators support the streaming evaluation and the
+    dataset contains the targets."""
+    return (hasattr(runner, "batch_results") and
+            dataset.has_series(decoder.data_id) and
+            all(supports_streaming(func) for func in evaluators))
+
+
+def can_log_from_train_step(trainer, runner):
+    """Checks whether the outputs logged on the training batches can be
+    computed in the training step, i.e. the trainer accepts additional
+    fetches and the runner provides them."""
+    return ("fetches" in inspect.signature(trainer.run).parameters and
+            hasattr(runner, "batch_fetches") and
+            hasattr(runner, "process_fetched"))
+
+
+def evaluate_streaming(sess, runner, all_coders, decoder, dataset,
+                       evaluators, postprocess, report_period=0):
+    """
+    Evaluates the model on a dataset batch by batch without keeping the
+    outputs in memory.
+
+    Args:
+
+        session: TF session the model parameters are in.
+
+        runner: A runner with the ``batch_results`` method.
+
+        all_coders: List of all encoders and decoders in the model.
+
+        decoder: The decoder used to generate outputs.
+
+        dataset: The dataset on which the model will be executed.
+
+        evaluators: List of evaluators that support the streaming
+            evaluation.
+
+        postprocess: an object to use as postprocessing of the outputs
+
+        report_period: If positive, the partial scores are logged every
+            ``report_period`` batches.
+
+    Returns:
+
+        The evaluation results, i.e. dictionary function -> value.
+
+    """
+    # pylint: disable=too-many-arguments
+    streaming_evaluators = [StreamingEvaluator(func) for func in evaluators]
+    targets = iter(dataset.get_series(decoder.data_id))
+
+    opt_loss = 0.0
+    dec_loss = 0.0
+    batch_count = 0
+    sentences = 0
+    # the batches are fed directly, so the memory does not grow with the
+    # size of the dataset
+    for result_raw, batch_opt_loss, batch_dec_loss in runner.batch_results(
+            sess, dataset, all_coders, cache=False):
+        batch_count += 1
+        opt_loss += batch_opt_loss
+        dec_loss += batch_dec_loss
+
+        if postprocess is not None:
+            result = postprocess(result_raw)
+        else:
+            result = result_raw
+        batch_targets = list(itertools.islice(targets, len(result)))
+        sentences += len(result)
+
+        for func in streaming_evaluators:
+            func.add(result, batch_targets)
+
+        if report_period > 0 and batch_count % report_period == 0:
+            log("Partial scores after {} sentences: {}".format(
+                sentences,
+                "    ".join("{}: {:.2f}".format(func.name, func.score())
+                            for func in streaming_evaluators)))
+
+    evaluation = {"opt_loss": opt_loss / batch_count,
+                  "dec_loss": dec_loss / batch_count}
+    for func in streaming_evaluators:
+        evaluation[func.name] = func.score()
+
+    return evaluation
+
+
+def evaluate_result(result_raw, opt_loss, dec_loss, dataset, decoder,
+                    evaluators, postprocess):
+    """
+    Postprocesses the outputs of a runner and evaluates them.
+
+    Args:
+
+        result_raw: The outputs of the runner.
+
+        opt_loss: The optimization loss computed by the runner.
+
+        dec_loss: The loss with the decoded inputs computed by the runner.
+
+        dataset: The dataset on which the outputs were computed.
+
+        decoder: The decoder used to generate outputs.
+
+        evaluators: List of evaluators that are used for the model
+            evaluation if the target data are provided.
+
+        postprocess: an object to use as postprocessing of the outputs
+
+    Returns:
+
+        Tuple of the postprocessed outputs and the evaluation results (empty
+            if the dataset does not contain the targets).
+
+    """
+    # pylint: disable=too-many-arguments
+    if postprocess is not None:
+        result = postprocess(result_raw)
+    else:
+        result = result_raw
+
     evaluation = {}
     if dataset.has_series(decoder.data_id):
         test_targets = dataset.get_series(decoder.data_id)
         evaluation["opt_loss"] = opt_loss
         evaluation["dec_loss"] = dec_loss
-        for func in evaluators:
-            evaluation[func.name] = func(result, test_targets)
+        scores = evaluator_pool.evaluate(evaluators, result, test_targets)
+        for func, score in zip(evaluators, scores):
+            evaluation[func.name] = score
 
-    return result, result_raw, evaluation
+    return result, evaluation
 
 
 def process_evaluation(evaluators, tb_writer, eval_result,
@@ -419,7 +938,8 @@ def process_evaluation(evaluators, tb_writer, eval_result,
         color=color)
 
     if tb_writer:
-        tb_writer.add_summary(summary_str, seen_instances)
+        if summary_str:
+            tb_writer.add_summary(summary_str, seen_instances)
         if histograms_str:
             tb_writer.add_summary(histograms_str, seen_instances)
         external_str = \
@@ -4,6 +4,9 @@ import tensorflow as tf
 
 class BidirectionalRNNLayer(object):
     """Bidirectional RNN Layer class - forward and backward RNN layers in one.
+
+    The layer works on a single time-major tensor, so the sequence is never
+    split into a list of time steps.
     """
 
     def __init__(self, forward_cell, backward_cell, inputs,
@@ -12,63 +15,52 @@ class BidirectionalRNNLayer(object):
 
         Args:
           cell - the type of the cell (LSTMCell, GRUCell, NoisyGRUCell, ...)
-          inputs - a list of inputs to the layer
+          inputs - a time-major tensor of inputs to the layer
+                   (time x batch x depth)
           sentence_lengths_placeholder - lengths of the sequences in inputs
 
         """
+        # the variable scopes are the same as with the statically unrolled
+        # RNNs, so the older models can still be loaded
         with tf.variable_scope('forward'):
-            self._outputs, self._last_state = tf.nn.rnn(
+            self._outputs, self._last_state = tf.nn.dynamic_rnn(
                 cell=forward_cell,
                 inputs=inputs,
+                sequence_length=sentence_lengths_placeholder,
                 dtype=tf.float32,
-                sequence_length=sentence_lengths_placeholder)
+                time_major=True)
 
         with tf.variable_scope('backward'):
-            outputs_rev_rev, self._last_state_rev = tf.nn.rnn(
+            outputs_rev_rev, self._last_state_rev = tf.nn.dynamic_rnn(
                 cell=backward_cell,
-                inputs=_reverse_seq(inputs, sentence_lengths_placeholder),
+                inputs=tf.reverse_sequence(inputs,
+                                           sentence_lengths_placeholder, 0, 1),
+                sequence_length=sentence_lengths_placeholder,
                 dtype=tf.float32,
-                sequence_length=sentence_lengths_placeholder)
+                time_major=True)
+
+            self._outputs_rev = tf.reverse_sequence(
+                outputs_rev_rev, sentence_lengths_placeholder, 0, 1)
 
-            self._outputs_rev = _reverse_seq(outputs_rev_rev,
-                                             sentence_lengths_placeholder)
+        # created only once, so the properties do not add operations to the
+        # graph on every access
+        self._outputs_bidi = tf.concat(2, [self._outputs, self._outputs_rev])
+        self._attention_tensor = tf.transpose(self._outputs_bidi, [1, 0, 2])
+        self._encoded = tf.concat(1, [self._last_state, self._last_state_rev])
 
 
     @property
     def outputs_bidi(self):
-        """Outputs of the bidirectional layer"""
-        return [tf.concat(1, [o1, o2]) for o1, o2 in zip(self._outputs,
-                                                         self._outputs_rev)]
+        """Outputs of the bidirectional layer (time x batch x 2*rnn_size)"""
+        return self._outputs_bidi
+
+    @property
+    def attention_tensor(self):
+        """Batch-major outputs of the bidirectional layer
+        (batch x time x 2*rnn_size) used as the attention states"""
+        return self._attention_tensor
 
     @property
     def encoded(self):
         """Last state of the bidirectional layer"""
-        return tf.concat(1, [self._last_state, self._last_state_rev])
-
-
-def _reverse_seq(input_seq, lengths):
-    """Reverse a list of Tensors up to specified lengths.
-
-    Arguments:
-        input_seq: Sequence of seq_len tensors of dimension
-                   (batch_size, depth)
-        lengths:   A tensor of dimension batch_size, containing lengths for
-                   each sequence in the batch. If "None" is specified,
-                   simply reverses the list.
-    Returns:
-        time-reversed sequence
-    """
-    if lengths is None:
-        return list(reversed(input_seq))
-
-    for input_ in input_seq:
-        input_.set_shape(input_.get_shape().with_rank(2))
-
-    # Join into (time, batch_size, depth)
-    s_joined = tf.pack(input_seq)
-
-    # Reverse along dimension 0
-    s_reversed = tf.reverse_sequence(s_joined, lengths, 0, 1)
-    # Split again into list
-    result = tf.unpack(s_reversed)
-    return result
+        return self._encoded
@@ -0,0 +1,19 @@
+# tests: lint, mypy
+
+import tensorflow as tf
+
+from neuralmonkey.build_mode import is_inference_only
+
+def dropout(variable, keep_prob):
+    """Performs dropout on a variable, unless the graph is built in the
+    inference-only mode, in which case the dropout is left out of the graph
+    completely.
+
+    Arguments:
+        variable: The tensor to perform the dropout on
+        keep_prob: Dropout keep probability (a float or a scalar tensor)
+    """
+    if is_inference_only():
+        return variable
+
+    return tf.nn.dropout(variable, keep_prob)
@@ -0,0 +1,289 @@
+"""
+This module implements the instrumentation for finding out where the
+training time goes.
+
+The step timer measures the phases of the training steps (preparing the
+batches, building the feed dictionaries, running the trainer, validating and
+writing the checkpoints) and reports the averages over each logging period.
+When the timing is switched off, the training loop uses a timer that does
+not measure anything.
+
+The tracing session runs the graph with the full tracing of the TensorFlow
+ops. The traces are written as timelines in the Chrome trace format (which
+can be opened at chrome://tracing) and as tables of the total time spent in
+the ops of each type.
+"""
+# tests: lint, mypy
+
+import os
+import time
+import codecs
+from collections import OrderedDict
+
+import tensorflow as tf
+from tensorflow.python.client import timeline
+
+from neuralmonkey.logging import log
+
+try:
+    #pylint: disable=unused-import,bare-except,invalid-name
+    from typing import Dict, List, Tuple
+except:
+    pass
+
+
+class _TimedPhase(object):
+    """Context manager adding its duration to a phase of the step timer."""
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.start = None # type: float
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timer.add(self.name, time.time() - self.start)
+
+
+class _NoPhase(object):
+    """Context manager which does not measure anything."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+class StepTimer(object):
+    """Measures the duration of the phases of the training steps.
+
+    The durations are summed until the next report, which logs the average
+    time spent in each phase per step together with the training throughput
+    and resets the counters.
+    """
+
+    def __init__(self):
+        self.totals = OrderedDict() # type: Dict[str, float]
+        self.steps = 0
+        self.sentences = 0
+        self.tokens = 0
+        self.period_start = time.time()
+
+    def phase(self, name):
+        """Returns a context manager measuring a phase of the step.
+
+        Arguments:
+            name: The name of the phase.
+        """
+        return _TimedPhase(self, name)
+
+    def add(self, name, seconds):
+        """Adds a duration to a phase.
+
+        Arguments:
+            name: The name of the phase.
+            seconds: The measured duration in seconds.
+        """
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+    def timed_iter(self, name, iterable):
+        """Wraps an iterable, so the time of producing its items is added to
+        a phase. This is used for the batches, which are created lazily.
+
+        Arguments:
+            name: The name of the phase.
+            iterable: The iterable to be wrapped.
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.add(name, time.time() - start)
+            yield item
+
+    def step(self, sentences):
+        """Records a finished training step.
+
+        Arguments:
+            sentences: The target sentences of the batch.
+        """
+        self.steps += 1
+        self.sentences += len(sentences)
+        self.tokens += sum(len(sentence) for sentence in sentences)
+
+    def report(self, tb_writer, seen_instances):
+        """Logs the statistics since the last report, writes them to the
+        TensorBoard and resets the counters.
+
+        Arguments:
+            tb_writer: The TensorBoard summary writer or None.
+            seen_instances: The number of seen training instances used as the
+                summary step.
+        """
+        elapsed = time.time() - self.period_start
+        if self.steps == 0 or elapsed <= 0:
+            return
+
+        per_step = [(name, 1000 * total / self.steps)
+                    for name, total in self.totals.items()]
+        sentences_per_sec = self.sentences / elapsed
+        tokens_per_sec = self.tokens / elapsed
+
+        log("Step timing (ms per step): {}    other: {:.1f}".format(
+            "    ".join("{}: {:.1f}".format(name, msec)
+                        for name, msec in per_step),
+            1000 * elapsed / self.steps - sum(m for _, m in per_step)))
+        log("Period throughput: {:.1f} sentences/s    {:.1f} tokens/s".format(
+            sentences_per_sec, tokens_per_sec))
+
+        if tb_writer:
+            values = [tf.Summary.Value(tag="timing/" + name + "_ms",
+                                       simple_value=msec)
+                      for name, msec in per_step]
+            values.append(tf.Summary.Value(tag="timing/sentences_per_sec",
+                                           simple_value=sentences_per_sec))
+            values.append(tf.Summary.Value(tag="timing/tokens_per_sec",
+                                           simple_value=tokens_per_sec))
+            tb_writer.add_summary(tf.Summary(value=values), seen_instances)
+
+        self.totals = OrderedDict()
+        self.steps = 0
+        self.sentences = 0
+        self.tokens = 0
+        self.period_start = time.time()
+
+
+class NoStepTimer(StepTimer):
+    """Step timer used when the timing is switched off."""
+
+    def phase(self, name):
+        return _NO_PHASE
+
+    def add(self, name, seconds):
+        pass
+
+    def timed_iter(self, name, iterable):
+        return iterable
+
+    def step(self, sentences):
+        pass
+
+    def report(self, tb_writer, seen_instances):
+        pass
+
+
+class TracingSession(object):
+    """Wraps a session, so all its runs are traced.
+
+    The wrapper is passed instead of the session to the trainers and the
+    runners, which only use its ``run`` method.
+    """
+
+    def __init__(self, sess):
+        """Creates the wrapper.
+
+        Arguments:
+            sess: The TF session to be wrapped.
+        """
+        self.sess = sess
+        self.run_metadata = [] # type: List[tf.RunMetadata]
+
+    def run(self, fetches, feed_dict=None):
+        """Runs the session with the tracing switched on."""
+        run_metadata = tf.RunMetadata()
+        result = self.sess.run(
+            fetches, feed_dict=feed_dict,
+            options=tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE),
+            run_metadata=run_metadata)
+        self.run_metadata.append(run_metadata)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self.sess, name)
+
+    def write(self, directory, name):
+        """Writes the traces of the runs.
+
+        Each run is written to its own timeline file, the table of the op
+        costs is aggregated over all the runs.
+
+        Arguments:
+            directory: The directory to write the traces to.
+            name: The name of the traced step used as the file name prefix.
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        for i, run_metadata in enumerate(self.run_metadata):
+            trace = timeline.Timeline(run_metadata.step_stats)
+            path = os.path.join(directory,
+                                "{}.run-{}.trace.json".format(name, i))
+            with codecs.open(path, 'w', 'utf-8') as f_trace:
+                f_trace.write(trace.generate_chrome_trace_format())
+
+        path = os.path.join(directory, "{}.ops.txt".format(name))
+        with codecs.open(path, 'w', 'utf-8') as f_ops:
+            f_ops.write(format_op_costs(
+                op_costs([m.step_stats for m in self.run_metadata])))
+
+        log("Traces of {} session run(s) written to {}/{}.*".format(
+            len(self.run_metadata), directory, name))
+
+
+def _op_type(node_stats):
+    """Gets the op type from the label of the node statistics which has the
+    form ``name = Type(inputs)``."""
+    label = node_stats.timeline_label
+    if " = " in label:
+        return label.split(" = ", 1)[1].split("(", 1)[0]
+    return node_stats.node_name
+
+
+def op_costs(step_stats_list):
+    """Aggregates the execution times of the ops by their types.
+
+    Arguments:
+        step_stats_list: List of the StepStats from the traced runs.
+
+    Returns:
+        List of tuples of the op type, the number of its executions and the
+        total time in microseconds, sorted from the most expensive.
+    """
+    counts = {} # type: Dict[str, int]
+    totals = {} # type: Dict[str, int]
+    for step_stats in step_stats_list:
+        for device_stats in step_stats.dev_stats:
+            for node_stats in device_stats.node_stats:
+                op_type = _op_type(node_stats)
+                counts[op_type] = counts.get(op_type, 0) + 1
+                totals[op_type] = (totals.get(op_type, 0) +
+                                   node_stats.op_end_rel_micros)
+
+    return sorted([(op_type, counts[op_type], totals[op_type])
+                   for op_type in counts],
+                  key=lambda x: x[2], reverse=True)
+
+
+def format_op_costs(costs):
+    """Formats the op costs as a text table.
+
+    Arguments:
+        costs: The op costs as returned by ``op_costs``.
+    """
+    total = sum(micros for _, _, micros in costs) or 1
+    lines = ["{:<40} {:>8} {:>12} {:>7}".format("op type", "count",
+                                                "time (ms)", "%")]
+    for op_type, count, micros in costs:
+        lines.append("{:<40} {:>8} {:>12.3f} {:>7.2f}".format(
+            op_type, count, micros / 1000, 100 * micros / total))
+    return "\n".join(lines) + "\n"
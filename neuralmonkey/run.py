@@ -2,12 +2,23 @@
 
 import sys
 import os
+import time
+import codecs
 
 from neuralmonkey.logging import log
+from neuralmonkey.build_mode import set_inference_only
 from neuralmonkey.config.configuration import Configuration
+from neuralmonkey.config.main_options import ignore_other_options
+from neuralmonkey.config.parsing import parse_file
+from neuralmonkey.snapshot import load_snapshot, save_snapshot
+from neuralmonkey.export import load_frozen_model
 from neuralmonkey.checking import check_dataset_and_coders
 from neuralmonkey.learning_utils import initialize_tf, run_on_dataset, \
-    print_dataset_evaluation
+    print_dataset_evaluation, can_evaluate_streaming, evaluate_streaming, \
+    evaluator_pool
+
+# how often the partial scores are logged in the streaming evaluation
+STREAMING_REPORT_PERIOD = 100
 
 CONFIG = Configuration()
 CONFIG.add_argument('output', str)
@@ -17,36 +28,57 @@ CONFIG.add_argument('postprocess')
 CONFIG.add_argument('evaluation', cond=list)
 CONFIG.add_argument('runner')
 CONFIG.add_argument('threads', int, required=False, default=4)
+CONFIG.add_argument('graph_snapshot', bool, required=False, default=False)
+CONFIG.add_argument('frozen_model', str, required=False, default=None)
+CONFIG.add_argument('evaluation_processes', int, required=False, default=1,
+                    cond=lambda x: x >= 1)
 
 # ignore arguments which are just for training
-CONFIG.ignore_argument('val_dataset')
-CONFIG.ignore_argument('trainer')
-CONFIG.ignore_argument('name')
-CONFIG.ignore_argument('train_dataset')
-CONFIG.ignore_argument('random_seed')
-CONFIG.ignore_argument('epochs')
-CONFIG.ignore_argument('batch_size')
-CONFIG.ignore_argument('tests_datasets')
-CONFIG.ignore_argument('initial_variables')
-CONFIG.ignore_argument('validation_period')
-CONFIG.ignore_argument('logging_period')
-CONFIG.ignore_argument('minimize')
-CONFIG.ignore_argument('save_n_best')
-CONFIG.ignore_argument('overwrite_output_dir')
-
-
-def initialize_for_running(ini_file):
+ignore_other_options(CONFIG)
+
+
+def initialize_for_running(ini_file, use_frozen=True):
     """Prepares everything that is necessary for running a model.
 
     Arguments:
         ini_file: Path to the configuration file.
+        use_frozen: Flag whether to load the frozen model if the
+            configuration specifies one.
 
     Returns:
         A tuple of parsed configuration (inlucding built computation graph)
         and a TensorFlow session with already loaded model variables.
     """
     # pylint: disable=no-member
-    args = CONFIG.load_file(ini_file)
+    # only the runtime part of the model graph is needed here
+    set_inference_only()
+
+    start_time = time.time()
+    args = None
+    main_section = _read_main_section(ini_file)
+
+    frozen_model = main_section.get('frozen_model')
+    if use_frozen and frozen_model:
+        args, sess = load_frozen_model(frozen_model, ini_file,
+                                       main_section.get('threads', 4))
+        log("Frozen model loaded in {:.2f} s"
+            .format(time.time() - start_time))
+        print("")
+        return args, sess
+
+    use_snapshot = main_section.get('graph_snapshot', False)
+    if use_snapshot and 'output' in main_section:
+        args = load_snapshot(main_section['output'], ini_file)
+
+    if args is None:
+        args = CONFIG.load_file(ini_file)
+        log("Model graph built in {:.2f} s"
+            .format(time.time() - start_time))
+        if use_snapshot:
+            save_snapshot(args.output, ini_file, args)
+    else:
+        log("Model graph imported from snapshot in {:.2f} s"
+            .format(time.time() - start_time))
     print("")
     variables_file = os.path.join(args.output, "variables.data.best")
     cont_index = 1
@@ -63,11 +95,29 @@ def initialize_for_running(ini_file):
             color="red")
         exit(1)
 
+    start_time = time.time()
     sess, _ = initialize_tf(variables_file, args.threads)
+    log("Session initialized in {:.2f} s".format(time.time() - start_time))
     print("")
 
     return args, sess
 
+
+def _read_main_section(ini_file):
+    """Reads the values from the main section of a configuration file
+    without building any of the configured objects.
+
+    Arguments:
+        ini_file: Path to the configuration file.
+    """
+    try:
+        with codecs.open(ini_file, 'r', 'utf-8') as f_ini:
+            return parse_file(f_ini).get('main', {})
+    # pylint: disable=broad-except
+    # the errors are reported when the configuration is properly loaded
+    except Exception:
+        return {}
+
 def main():
     # pylint: disable=no-member,broad-except
     if len(sys.argv) != 3:
@@ -78,6 +128,9 @@ def main():
     test_datasets.add_argument('test_datasets')
 
     args, sess = initialize_for_running(sys.argv[1])
+    # the snapshots and the frozen models store the loaded configuration,
+    # so the value is missing only in those saved before it was added
+    evaluator_pool.processes = getattr(args, 'evaluation_processes', 1)
 
     datasets_args = test_datasets.load_file(sys.argv[2])
     print("")
@@ -90,8 +143,20 @@ def main():
         exit(1)
 
     for dataset in datasets_args.test_datasets:
-        _, _, evaluation = run_on_dataset(
-            sess, args.runner, args.encoders + [args.decoder], args.decoder,
-            dataset, args.evaluation, args.postprocess, write_out=True)
+        # when the outputs are not written, they need not be kept in memory
+        if (args.decoder.data_id not in dataset.series_outputs and
+                can_evaluate_streaming(args.runner, args.decoder, dataset,
+                                       args.evaluation)):
+            evaluation = evaluate_streaming(
+                sess, args.runner, args.encoders + [args.decoder],
+                args.decoder, dataset, args.evaluation, args.postprocess,
+                report_period=STREAMING_REPORT_PERIOD)
+        else:
+            _, _, evaluation = run_on_dataset(
+                sess, args.runner, args.encoders + [args.decoder],
+                args.decoder, dataset, args.evaluation, args.postprocess,
+                write_out=True)
         if evaluation:
             print_dataset_evaluation(dataset.name, evaluation)
+
+    evaluator_pool.close()
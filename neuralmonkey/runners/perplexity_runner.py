@@ -9,7 +9,8 @@ its perplexities given the decoder.
 import numpy as np
 import tensorflow as tf
 
-from neuralmonkey.learning_utils import feed_dicts
+from neuralmonkey.learning_utils import cached_feed_dicts, \
+    streamed_feed_dicts
 
 class PerplexityRunner(object):
     def __init__(self, decoder, batch_size):
@@ -21,25 +22,44 @@ class PerplexityRunner(object):
             decoder.gt_logits, decoder.targets, decoder.weights_ins,
             len(decoder.vocabulary))
 
-    def __call__(self, sess, dataset, coders):
+    def batch_results(self, sess, dataset, coders, cache=True):
+        """Computes the perplexities of the batches of a dataset one by one.
+
+        Arguments:
+            cache: Whether the feed dictionaries of the dataset can be
+                cached for the next runs.
+
+        Yields:
+            A tuple of the sentence perplexities of the batch and the two
+            losses for every batch.
+        """
         if not dataset.has_series(self.decoder.data_id):
             raise Exception("Dataset must have the target values ({}) for computing perplexity.".\
                     format(self.decoder.data_id))
 
-        batched_dataset = dataset.batch_dataset(self.batch_size)
         losses = [self.decoder.loss_with_gt_ins,
                   self.decoder.loss_with_decoded_ins]
+
+        if cache:
+            batches = cached_feed_dicts(dataset, coders, self.batch_size)
+        else:
+            batches = streamed_feed_dicts(dataset, coders, self.batch_size)
+
+        for batch_feed_dict in batches:
+            cross_entropies, opt_loss, dec_loss = \
+                sess.run([self.cross_entropies_op] + losses, feed_dict=batch_feed_dict)
+            yield [2 ** xent for xent in cross_entropies], opt_loss, dec_loss
+
+    def __call__(self, sess, dataset, coders):
         perplexities = []
 
         loss_with_gt_ins = 0.0
         loss_with_decoded_ins = 0.0
         batch_count = 0
-        for batch in batched_dataset:
+        for batch_perplexities, opt_loss, dec_loss in \
+                self.batch_results(sess, dataset, coders):
             batch_count += 1
-            batch_feed_dict = feed_dicts(batch, coders, train=False)
-            cross_entropies, opt_loss, dec_loss = \
-                sess.run([self.cross_entropies_op] + losses, feed_dict=batch_feed_dict)
-            perplexities.extend([2 ** xent for xent in cross_entropies])
+            perplexities.extend(batch_perplexities)
             loss_with_gt_ins += opt_loss
             loss_with_decoded_ins += dec_loss
 
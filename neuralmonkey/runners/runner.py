@@ -1,6 +1,7 @@
 import tensorflow as tf
 
-from neuralmonkey.learning_utils import feed_dicts
+from neuralmonkey.learning_utils import cached_feed_dicts, \
+    streamed_feed_dicts
 
 # tests: mypy
 
@@ -10,31 +11,68 @@ class GreedyRunner(object):
         self.batch_size = batch_size
         self.vocabulary = decoder.vocabulary
 
+    def batch_fetches(self, has_targets):
+        """Returns the tensors computed for every batch.
+
+        Arguments:
+            has_targets: Flag whether the batch contains the target sentences,
+                so the losses can be computed.
+        """
+        # if is a target sentence, compute also the losses
+        # otherwise, just compute zero
+        if has_targets:
+            losses = [self.decoder.train_loss,
+                      self.decoder.runtime_loss]
+        else:
+            losses = [None, None]
+
+        # the training loss does not exist in inference-only graphs
+        losses = [l if l is not None else tf.zeros([]) for l in losses]
+
+        return losses + self.decoder.decoded
+
+    def process_fetched(self, computation):
+        """Converts the values of the tensors from ``batch_fetches``.
+
+        Returns:
+            A tuple of the decoded sentences and the two losses.
+        """
+        decoded_sentences = self.vocabulary.vectors_to_sentences(
+            computation[2:])
+        return decoded_sentences, computation[0], computation[1]
+
+    def batch_results(self, sess, dataset, coders, cache=True):
+        """Runs the model on the batches of a dataset one by one.
+
+        Arguments:
+            cache: Whether the feed dictionaries of the dataset can be
+                cached for the next runs.
+
+        Yields:
+            A tuple of the decoded sentences of the batch and the two losses
+            for every batch.
+        """
+        fetches = self.batch_fetches(dataset.has_series(self.decoder.data_id))
+        if cache:
+            batches = cached_feed_dicts(dataset, coders, self.batch_size)
+        else:
+            batches = streamed_feed_dicts(dataset, coders, self.batch_size)
+
+        for batch_feed_dict in batches:
+            computation = sess.run(fetches, feed_dict=batch_feed_dict)
+            yield self.process_fetched(computation)
+
     def __call__(self, sess, dataset, coders):
-        batched_dataset = dataset.batch_dataset(self.batch_size)
         decoded_sentences = []
 
         loss_with_gt_ins = 0.0
         loss_with_decoded_ins = 0.0
         batch_count = 0
-        for batch in batched_dataset:
-            batch_feed_dict = feed_dicts(batch, coders, train=False)
+        for decoded_sentences_batch, opt_loss, dec_loss in \
+                self.batch_results(sess, dataset, coders):
             batch_count += 1
-
-            # if is a target sentence, compute also the losses
-            # otherwise, just compute zero
-            if dataset.has_series(self.decoder.data_id):
-                losses = [self.decoder.train_loss,
-                          self.decoder.runtime_loss]
-            else:
-                losses = [tf.zeros([]), tf.zeros([])]
-
-            computation = sess.run(losses + self.decoder.decoded,
-                                   feed_dict=batch_feed_dict)
-            loss_with_gt_ins += computation[0]
-            loss_with_decoded_ins += computation[1]
-            decoded_sentences_batch = \
-                    self.vocabulary.vectors_to_sentences(computation[len(losses):])
+            loss_with_gt_ins += opt_loss
+            loss_with_decoded_ins += dec_loss
             decoded_sentences += decoded_sentences_batch
 
         return decoded_sentences, \
@@ -0,0 +1,113 @@
+"""This module implements the vocabulary shortlist which restricts the output
+vocabulary of the decoder at inference time to a set of candidate words.
+
+The candidates for a batch are the most frequent target words together with
+the most probable translations of the words in the source sentences of the
+batch, taken from a precomputed lexical translation table.
+"""
+# tests: lint, mypy
+
+from typing import Dict, List
+
+import codecs
+import numpy as np
+
+from neuralmonkey.logging import log
+from neuralmonkey.dataset import Dataset
+from neuralmonkey.vocabulary import (Vocabulary, PAD_TOKEN, START_TOKEN,
+                                     END_TOKEN, UNK_TOKEN)
+
+
+class LexicalShortlist(object):
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, lexical_table: str, vocabulary: Vocabulary,
+                 source_data_id: str, translations_per_word: int=20,
+                 frequent_words: int=1000, encoding: str="utf-8") -> None:
+        """Creates a new shortlist.
+
+        Arguments:
+            lexical_table: Path to the lexical translation table. Each line
+                contains a source word, a target word and optionally the
+                translation probability, separated by whitespace.
+            vocabulary: The target (decoder) vocabulary.
+            source_data_id: Identifier of the source data series the
+                candidates are selected for.
+            translations_per_word: Number of the most probable translations
+                of each source word added to the shortlist.
+            frequent_words: Number of the most frequent target words that are
+                always in the shortlist.
+            encoding: Encoding of the lexical table.
+        """
+        self.vocabulary = vocabulary
+        self.source_data_id = source_data_id
+        self.translations_per_word = translations_per_word
+
+        special = [vocabulary.get_word_index(w) for w in
+                   [PAD_TOKEN, START_TOKEN, END_TOKEN, UNK_TOKEN]]
+        words_by_freq = sorted(vocabulary.word_count.keys(),
+                               key=lambda w: -vocabulary.word_count[w])
+        self.frequent_indices = np.unique(np.array(
+            special + [vocabulary.get_word_index(w)
+                       for w in words_by_freq[:frequent_words]],
+            dtype=np.int32))
+
+        self.translations = self._load_table(lexical_table, encoding)
+
+        log("Lexical shortlist loaded: {} source words, {} frequent words"
+            .format(len(self.translations), len(self.frequent_indices)))
+
+
+    def _load_table(self, path: str, encoding: str) -> Dict[str, np.ndarray]:
+        """Loads the most probable translations from the lexical table.
+
+        Arguments:
+            path: Path to the lexical table.
+            encoding: Encoding of the file.
+
+        Returns:
+            Dictionary from source words to arrays of target word indices.
+        """
+        entries = {} # type: Dict[str, List]
+        with codecs.open(path, 'r', encoding) as f_table:
+            for line in f_table:
+                fields = line.split()
+                if len(fields) < 2:
+                    continue
+
+                target = fields[1]
+                if target not in self.vocabulary:
+                    continue
+
+                prob = float(fields[2]) if len(fields) > 2 else 1.0
+                entries.setdefault(fields[0], []).append(
+                    (prob, self.vocabulary.get_word_index(target)))
+
+        translations = {}
+        for source, targets in entries.items():
+            targets.sort(key=lambda t: -t[0])
+            translations[source] = np.array(
+                [index for _, index in targets[:self.translations_per_word]],
+                dtype=np.int32)
+
+        return translations
+
+
+    def candidates(self, dataset: Dataset) -> np.ndarray:
+        """Selects the candidate target words for a batch.
+
+        Arguments:
+            dataset: The (batched) dataset with the source sentences.
+
+        Returns:
+            Sorted array of unique target vocabulary indices. The first item
+            is always the index of the padding symbol.
+        """
+        sentences = dataset.get_series(self.source_data_id)
+        indices = [self.frequent_indices]
+        for sentence in sentences:
+            for word in sentence:
+                if word in self.translations:
+                    indices.append(self.translations[word])
+
+        return np.unique(np.concatenate(indices))
@@ -0,0 +1,209 @@
+"""
+This module implements saving and loading of serialized graph snapshots.
+
+A snapshot consists of the exported MetaGraph of an already built model and
+of the pickled Python objects from the configuration (encoders, decoder,
+runner, ...). The TensorFlow objects the Python objects refer to are not
+pickled, only their names are stored and they are looked up in the imported
+graph when the snapshot is loaded. This way, the INI file does not need to be
+interpreted and the static graph does not need to be rebuilt when a trained
+model is started repeatedly.
+"""
+# tests: lint, mypy
+
+import os
+import pickle
+import hashlib
+
+import tensorflow as tf
+
+from neuralmonkey.logging import log
+
+SNAPSHOT_META = "graph_snapshot.meta"
+SNAPSHOT_OBJECTS = "graph_snapshot.pickle"
+
+
+class GraphPickler(pickle.Pickler):
+    """Pickler which stores only names of the TensorFlow objects."""
+
+    def persistent_id(self, obj):
+        # pylint: disable=no-self-use
+        # tf.Variable is not a subclass of tf.Tensor
+        if isinstance(obj, tf.Variable):
+            return ("variable", obj.name)
+        if isinstance(obj, tf.Tensor):
+            return ("tensor", obj.name)
+        if isinstance(obj, tf.Operation):
+            return ("operation", obj.name)
+        if isinstance(obj, tf.Graph):
+            return ("graph", None)
+        return None
+
+
+class GraphUnpickler(pickle.Unpickler):
+    """Unpickler which resolves the TensorFlow object names in a graph."""
+
+    def __init__(self, file, graph, variables, allow_missing=False):
+        """Creates the unpickler.
+
+        Arguments:
+            file: The file to read the pickle from.
+            graph: The graph in which the TensorFlow objects are looked up.
+            variables: The variables of the graph.
+            allow_missing: Whether the objects missing in the graph (e.g.
+                pruned from a frozen graph) are loaded as None instead of
+                raising an error.
+        """
+        super().__init__(file)
+        self.graph = graph
+        self.variables = {v.name: v for v in variables}
+        self.allow_missing = allow_missing
+
+    def persistent_load(self, pid):
+        try:
+            kind, name = pid
+        except (TypeError, ValueError):
+            raise pickle.UnpicklingError(
+                "Unknown persistent ID: {!r}".format(pid))
+
+        if kind == "graph":
+            return self.graph
+        if kind not in ["variable", "tensor", "operation"]:
+            raise pickle.UnpicklingError(
+                "Unknown kind of graph object: {!r}".format(kind))
+
+        try:
+            if kind == "variable" and name in self.variables:
+                return self.variables[name]
+            if kind == "operation":
+                return self.graph.get_operation_by_name(name)
+            return self.graph.get_tensor_by_name(name)
+        except (KeyError, ValueError):
+            if self.allow_missing:
+                return None
+            raise pickle.UnpicklingError(
+                "The graph does not contain '{}'.".format(name))
+
+
+def config_hash(ini_file):
+    """Computes a hash of the contents of a configuration file.
+
+    Arguments:
+        ini_file: Path to the configuration file.
+    """
+    with open(ini_file, 'rb') as f_ini:
+        return hashlib.sha1(f_ini.read()).hexdigest()
+
+
+def dump_objects(path, objects, **info):
+    """Pickles Python objects that refer to the current default graph.
+
+    Arguments:
+        path: Path to the pickle file.
+        objects: The object (or a structure of objects) to pickle.
+        info: Additional information stored along with the objects.
+    """
+    with open(path, 'wb') as f_pickle:
+        # the information is stored separately so it can be read without
+        # having the graph imported
+        pickle.dump(info, f_pickle)
+        GraphPickler(f_pickle).dump(objects)
+
+
+def load_objects(path, graph=None, allow_missing=False):
+    """Unpickles objects stored by ``dump_objects``.
+
+    The graph the objects refer to must be already imported.
+
+    Arguments:
+        path: Path to the pickle file.
+        graph: The graph in which the TensorFlow objects are looked up.
+            Defaults to the default graph.
+        allow_missing: Whether the TensorFlow objects missing in the graph
+            are loaded as None instead of raising ``pickle.UnpicklingError``.
+
+    Returns:
+        A tuple of the additional information dictionary and the objects.
+    """
+    if graph is None:
+        graph = tf.get_default_graph()
+
+    with graph.as_default():
+        variables = tf.all_variables()
+
+    with open(path, 'rb') as f_pickle:
+        info = pickle.load(f_pickle)
+        objects = GraphUnpickler(f_pickle, graph, variables,
+                                 allow_missing).load()
+
+    return info, objects
+
+
+def save_snapshot(directory, ini_file, args):
+    """Exports the current default graph and the configuration objects.
+
+    Arguments:
+        directory: Directory where the snapshot is saved.
+        ini_file: The configuration file the graph was built from.
+        args: Namespace with the loaded configuration.
+
+    Returns:
+        True if the snapshot was saved, False otherwise.
+    """
+    meta_file = os.path.join(directory, SNAPSHOT_META)
+    objects_file = os.path.join(directory, SNAPSHOT_OBJECTS)
+
+    try:
+        tf.train.export_meta_graph(filename=meta_file)
+        dump_objects(objects_file, args, config_hash=config_hash(ini_file))
+    # pylint: disable=broad-except
+    except Exception as exc:
+        log("Graph snapshot could not be saved: {}".format(exc), color='red')
+        for path in [meta_file, objects_file]:
+            if os.path.exists(path):
+                os.remove(path)
+        return False
+
+    log("Graph snapshot saved to {}".format(meta_file))
+    return True
+
+
+def load_snapshot(directory, ini_file):
+    """Imports the graph snapshot to the default graph if it exists and was
+    created from the same configuration file.
+
+    Arguments:
+        directory: Directory where the snapshot is saved.
+        ini_file: The configuration file the snapshot should correspond to.
+
+    Returns:
+        Namespace with the configuration objects or None if there is no
+        usable snapshot.
+    """
+    meta_file = os.path.join(directory, SNAPSHOT_META)
+    objects_file = os.path.join(directory, SNAPSHOT_OBJECTS)
+
+    if not os.path.exists(meta_file) or not os.path.exists(objects_file):
+        return None
+
+    with open(objects_file, 'rb') as f_pickle:
+        # only peek at the information, the graph is not imported yet
+        info = pickle.load(f_pickle)
+    if info.get("config_hash") != config_hash(ini_file):
+        log("Graph snapshot in {} was created from a different "
+            "configuration, ignoring it.".format(directory), color='red')
+        return None
+
+    log("Importing graph snapshot from {}".format(meta_file))
+    try:
+        tf.train.import_meta_graph(meta_file)
+        _, args = load_objects(objects_file)
+    # pylint: disable=broad-except
+    except Exception as exc:
+        log("Graph snapshot in {} could not be loaded, building the graph "
+            "from the configuration: {}".format(directory, exc), color='red')
+        # the partially imported snapshot must not stay in the graph
+        tf.reset_default_graph()
+        return None
+
+    return args
@@ -27,7 +27,8 @@ CORPUS_REFERENCE = [
 DECODED = [d.split() for d in CORPUS_DECODED]
 REFERENCE = [r.split() for r in CORPUS_REFERENCE]
 
-FUNC = BLEUEvaluator()
+FUNC = BLEUEvaluator(cache_references=False)
+CACHED_FUNC = BLEUEvaluator()
 
 class TestBLEU(unittest.TestCase):
 
@@ -51,6 +52,37 @@ class TestBLEU(unittest.TestCase):
         score = FUNC(DECODED, REFERENCE)
         self.assertAlmostEqual(score, 15, delta=10)
 
+    def test_cached_references(self):
+        for decoded, reference in [(DECODED, REFERENCE),
+                                   (REFERENCE, REFERENCE),
+                                   ([[] for _ in DECODED], REFERENCE),
+                                   (DECODED + [["something"]],
+                                    REFERENCE + [[]]),
+                                   (DECODED, REFERENCE)]:
+            self.assertAlmostEqual(CACHED_FUNC(decoded, reference),
+                                   FUNC(decoded, reference))
+
+    def test_cached_statistics_reused(self):
+        func = BLEUEvaluator()
+        statistics = func.reference_statistics(REFERENCE)
+        self.assertIs(func.reference_statistics(
+            [list(r) for r in REFERENCE]), statistics)
+        self.assertIsNot(func.reference_statistics(REFERENCE[1:]),
+                         statistics)
+
+    def test_cache_interleaved_batches(self):
+        # the training batches are logged between the validations
+        func = BLEUEvaluator()
+        func(DECODED, REFERENCE)
+        for start in range(3):
+            func(DECODED[start:start + 2], REFERENCE[start:start + 2])
+            func(DECODED, REFERENCE)
+
+        cache = func._reference_cache # pylint: disable=protected-access
+        # the validation references are counted only once
+        self.assertEqual(cache.misses, 4)
+        self.assertEqual(cache.hits, 3)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+# tests: mypy, lint
+
+import unittest
+
+import numpy as np
+
+from neuralmonkey.evaluators.accuracy import Accuracy
+from neuralmonkey.evaluators.bleu import BLEUEvaluator
+from neuralmonkey.evaluators.bootstrap import sentence_statistics, \
+    sample_counts, resampled_scores, paired_bootstrap
+from neuralmonkey.tests.test_bleu import DECODED, REFERENCE
+
+
+class TestBootstrap(unittest.TestCase):
+
+    def test_statistics_sum_to_corpus_score(self):
+        for evaluator in [BLEUEvaluator(), Accuracy()]:
+            statistics = sentence_statistics(evaluator, DECODED, REFERENCE)
+            self.assertAlmostEqual(
+                evaluator.score_from_statistics(statistics.sum(axis=0)),
+                evaluator(DECODED, REFERENCE))
+
+    def test_deduplicated_statistics(self):
+        evaluator = BLEUEvaluator(deduplicate=True)
+        statistics = sentence_statistics(evaluator, DECODED, REFERENCE)
+        self.assertAlmostEqual(
+            evaluator.score_from_statistics(statistics.sum(axis=0)),
+            evaluator(DECODED, REFERENCE))
+
+    def test_different_lengths(self):
+        with self.assertRaises(ValueError):
+            sentence_statistics(Accuracy(), DECODED[1:], REFERENCE)
+        with self.assertRaises(ValueError):
+            paired_bootstrap(Accuracy(), DECODED, DECODED[1:], REFERENCE)
+        with self.assertRaises(ValueError):
+            paired_bootstrap(Accuracy(), DECODED, DECODED, REFERENCE[1:])
+
+    def test_sample_counts(self):
+        counts = sample_counts(7, 50, np.random.RandomState(0))
+        self.assertEqual(counts.shape, (50, 7))
+        self.assertTrue(np.all(counts.sum(axis=1) == 7))
+
+    def test_resampled_scores(self):
+        evaluator = BLEUEvaluator()
+        statistics = sentence_statistics(evaluator, DECODED, REFERENCE)
+        scores, = resampled_scores(evaluator, [statistics], samples=250,
+                                   seed=1)
+        self.assertEqual(scores.shape, (250,))
+        self.assertTrue(np.all(scores >= 0))
+        self.assertTrue(np.all(scores <= 100))
+
+    def test_paired_identical_systems(self):
+        result = paired_bootstrap(BLEUEvaluator(), DECODED, DECODED,
+                                  REFERENCE, samples=100, seed=1)
+        self.assertEqual(result["score_a"], result["score_b"])
+        self.assertEqual(result["p_value"], 1)
+
+    def test_paired_better_system(self):
+        result = paired_bootstrap(BLEUEvaluator(), REFERENCE, DECODED,
+                                  REFERENCE, samples=100, seed=1)
+        self.assertGreater(result["score_a"], result["score_b"])
+        self.assertLess(result["p_value"], 0.05)
+        low, high = result["interval_b"]
+        self.assertLessEqual(low, high)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+# tests: mypy, lint
+
+import unittest
+
+from neuralmonkey.evaluators.chrf import ChrFEvaluator
+from neuralmonkey.evaluators.streaming import StreamingEvaluator
+
+
+CORPUS_DECODED = [
+    "colorful thoughts furiously sleep",
+    "little piglet slept all night",
+    "working working working working working be be be be be be be",
+    "ich bin walrus",
+    "walrus for präsident"
+]
+
+CORPUS_REFERENCE = [
+    "the colorless ideas slept furiously",
+    "pooh slept all night",
+    "working class hero is something to be",
+    "I am the working class walrus",
+    "walrus for president"
+]
+
+
+DECODED = [d.split() for d in CORPUS_DECODED]
+REFERENCE = [r.split() for r in CORPUS_REFERENCE]
+
+FUNC = ChrFEvaluator()
+
+
+class TestChrF(unittest.TestCase):
+
+    def test_identical(self):
+        self.assertAlmostEqual(FUNC(REFERENCE, REFERENCE), 100)
+
+    def test_empty_decoded(self):
+        self.assertEqual(FUNC([[] for _ in DECODED], REFERENCE), 0)
+
+    def test_name(self):
+        self.assertEqual(FUNC.name, "chrF3")
+        self.assertEqual(ChrFEvaluator(beta=1, name="chrF").name, "chrF")
+
+    def test_known_value(self):
+        # with the unigrams only, 3 of 4 characters are correct
+        func = ChrFEvaluator(n=1, beta=1)
+        self.assertAlmostEqual(func([["abcd"]], [["abce"]]), 75)
+
+    def test_cached_references(self):
+        uncached = ChrFEvaluator(cache_references=False)
+        for _ in range(2):
+            self.assertAlmostEqual(FUNC(DECODED, REFERENCE),
+                                   uncached(DECODED, REFERENCE))
+        self.assertAlmostEqual(FUNC(DECODED[1:], REFERENCE[1:]),
+                               uncached(DECODED[1:], REFERENCE[1:]))
+
+    def test_cache_interleaved_batches(self):
+        func = ChrFEvaluator()
+        func(DECODED, REFERENCE)
+        for start in range(3):
+            func(DECODED[start:start + 2], REFERENCE[start:start + 2])
+            func(DECODED, REFERENCE)
+
+        cache = func._reference_cache # pylint: disable=protected-access
+        self.assertEqual(cache.misses, 4)
+        self.assertEqual(cache.hits, 3)
+
+    def test_whitespace(self):
+        func = ChrFEvaluator(n=4)
+        func_spaces = ChrFEvaluator(n=4, ignore_whitespace=False)
+        self.assertAlmostEqual(func([["ab", "cd"]], [["abcd"]]), 100)
+        self.assertLess(func_spaces([["ab", "cd"]], [["abcd"]]), 100)
+
+    def test_streaming(self):
+        streaming = StreamingEvaluator(FUNC)
+        for start in range(0, len(DECODED), 2):
+            streaming.add(DECODED[start:start + 2], REFERENCE[start:start + 2])
+        self.assertAlmostEqual(streaming.score(), FUNC(DECODED, REFERENCE))
+
+
+if __name__ == "__main__":
+    unittest.main()
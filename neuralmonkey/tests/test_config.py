@@ -5,6 +5,9 @@
 
 import unittest
 import neuralmonkey.config.parsing as parsing
+from neuralmonkey.config.configuration import Configuration
+from neuralmonkey.config.main_options import MAIN_OPTIONS, \
+    ignore_other_options
 
 SPLITTER_TESTS = [
     ["empty", "", []],
@@ -23,6 +26,18 @@ class TestParsing(unittest.TestCase):
         self.assertRaises(Exception, parsing._split_on_commas, "(omg,brac],kets")
 
 
+class TestMainOptions(unittest.TestCase):
+
+    def test_ignore_other_options(self):
+        config = Configuration()
+        config.add_argument('output', str)
+        config.add_argument('decoder')
+        ignore_other_options(config)
+
+        self.assertEqual(config.ignored,
+                         set(MAIN_OPTIONS) - {'output', 'decoder'})
+
+
 
 def test_splitter_gen(a, b):
     def test_case_fun(self):
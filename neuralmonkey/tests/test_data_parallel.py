@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+""" Unit tests for averaging of the gradients in data-parallel training. """
+# tests: mypy, lint
+
+import unittest
+from collections import namedtuple
+
+import numpy as np
+
+from neuralmonkey.data_parallel import average_gradients
+
+# has the same fields as tf.IndexedSlicesValue
+SparseValue = namedtuple("SparseValue", ["values", "indices", "dense_shape"])
+
+class TestAverageGradients(unittest.TestCase):
+
+    def test_dense(self):
+        averaged = average_gradients(
+            [[np.array([1.0, 2.0])], [np.array([3.0, 6.0])]], [1, 1])
+        np.testing.assert_allclose(averaged[0], [2.0, 4.0])
+
+    def test_weighted(self):
+        averaged = average_gradients(
+            [[np.array([1.0])], [np.array([4.0])]], [2, 1])
+        np.testing.assert_allclose(averaged[0], [2.0])
+
+    def test_sparse(self):
+        first = SparseValue(np.array([[1.0, 1.0]]), np.array([3]),
+                            np.array([5, 2]))
+        second = SparseValue(np.array([[3.0, 3.0], [2.0, 2.0]]),
+                             np.array([3, 0]), np.array([5, 2]))
+
+        averaged = average_gradients([[first], [second]], [1, 1])[0]
+        self.assertIsInstance(averaged, SparseValue)
+        np.testing.assert_array_equal(averaged.indices, [3, 3, 0])
+        np.testing.assert_allclose(averaged.values,
+                                   [[0.5, 0.5], [1.5, 1.5], [1.0, 1.0]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,14 +5,41 @@
 
 import unittest
 
+import tensorflow as tf
+
 from neuralmonkey.decoders.decoder import Decoder
 from neuralmonkey.vocabulary import Vocabulary
+from neuralmonkey.build_mode import set_inference_only
 
 class TestDecoder(unittest.TestCase):
 
     def test_init(self):
-        decoder = Decoder([], Vocabulary(), "foo")
-        self.assertIsNotNone(decoder)
+        with tf.Graph().as_default():
+            decoder = Decoder([], Vocabulary(), "foo")
+            self.assertIsNotNone(decoder)
+
+    def test_init_inference_only(self):
+        set_inference_only()
+        try:
+            with tf.Graph().as_default():
+                decoder = Decoder([], Vocabulary(), "foo")
+                self.assertIsNone(decoder.train_loss)
+                self.assertIsNotNone(decoder.runtime_loss)
+        finally:
+            set_inference_only(False)
+
+    def test_init_sampled_loss(self):
+        with tf.Graph().as_default():
+            decoder = Decoder([], Vocabulary(), "foo",
+                              sampled_softmax_samples=2)
+            self.assertIsNotNone(decoder.sampled_loss)
+            self.assertIsNotNone(decoder.train_loss)
+
+    def test_init_unknown_sampled_loss(self):
+        with tf.Graph().as_default():
+            with self.assertRaises(ValueError):
+                Decoder([], Vocabulary(), "foo", sampled_softmax_samples=2,
+                        sampled_loss_type="foo")
 
 if __name__ == "__main__":
     unittest.main()
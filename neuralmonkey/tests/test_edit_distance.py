@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+# tests: mypy, lint
+
+import random
+import unittest
+
+from neuralmonkey.evaluators.edit_distance import EditDistance, levenshtein, \
+    corpus_levenshtein
+
+
+def dynamic_programming_levenshtein(seq1, seq2):
+    previous = list(range(len(seq2) + 1))
+    for i, item1 in enumerate(seq1, 1):
+        current = [i]
+        for j, item2 in enumerate(seq2, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (item1 != item2)))
+        previous = current
+    return previous[-1]
+
+
+class TestEditDistance(unittest.TestCase):
+
+    def test_known_distances(self):
+        self.assertEqual(levenshtein("kitten", "sitting"), 3)
+        self.assertEqual(levenshtein("", "abc"), 3)
+        self.assertEqual(levenshtein("abc", ""), 3)
+        self.assertEqual(levenshtein("", ""), 0)
+        self.assertEqual(levenshtein("flaw", "lawn"), 2)
+        self.assertEqual(levenshtein("the cat sat".split(),
+                                     "the black cat sat down".split()), 2)
+
+    def test_random_sequences(self):
+        rng = random.Random(42)
+        for _ in range(500):
+            # longer than 64 symbols, so more than one machine word
+            seq1 = [rng.choice("abcd") for _ in range(rng.randint(0, 130))]
+            seq2 = [rng.choice("abce") for _ in range(rng.randint(0, 130))]
+            self.assertEqual(levenshtein(seq1, seq2),
+                             dynamic_programming_levenshtein(seq1, seq2))
+
+    def test_corpus(self):
+        distances = corpus_levenshtein(["abc", "abc", "xyz"],
+                                       ["abc", "abd", ""])
+        self.assertEqual(list(distances), [0, 1, 3])
+
+    def test_evaluator_levels(self):
+        decoded = [["a", "small", "house"], ["hello"]]
+        references = [["a", "big", "house"], ["hello"]]
+
+        self.assertAlmostEqual(EditDistance(level="token")(decoded,
+                                                           references),
+                               1 / 4)
+        self.assertAlmostEqual(EditDistance()(decoded, references), 5 / 16)
+        self.assertEqual(EditDistance()(references, references), 0)
+
+    def test_unknown_level(self):
+        with self.assertRaises(ValueError):
+            EditDistance(level="word")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+# tests: mypy, lint
+
+import unittest
+import multiprocessing
+
+from neuralmonkey.evaluators.accuracy import Accuracy
+from neuralmonkey.evaluators.bleu import BLEUEvaluator
+from neuralmonkey.evaluators.pool import EvaluatorPool
+from neuralmonkey.tests.test_bleu import DECODED, REFERENCE
+
+
+def _evaluate_in_pool(results):
+    pool = EvaluatorPool(processes=2)
+    try:
+        results.put(pool.evaluate([BLEUEvaluator(), Accuracy()],
+                                  DECODED, REFERENCE))
+    except Exception as exc: # pylint: disable=broad-except
+        results.put(repr(exc))
+    finally:
+        pool.close()
+
+
+class TestEvaluatorPool(unittest.TestCase):
+
+    def test_same_scores(self):
+        evaluators = [BLEUEvaluator(), Accuracy()]
+        pool = EvaluatorPool(processes=2)
+        try:
+            scores = pool.evaluate(evaluators, DECODED, REFERENCE)
+        finally:
+            pool.close()
+        self.assertEqual(scores, [func(DECODED, REFERENCE)
+                                  for func in evaluators])
+
+    def test_daemonic_process(self):
+        # the asynchronous validator runs as a daemonic spawned process
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        process = context.Process(target=_evaluate_in_pool,
+                                  args=(results,), daemon=True)
+        process.start()
+        scores = results.get(timeout=60)
+        process.join()
+
+        self.assertEqual(scores, [BLEUEvaluator()(DECODED, REFERENCE),
+                                  Accuracy()(DECODED, REFERENCE)])
+
+
+if __name__ == "__main__":
+    unittest.main()
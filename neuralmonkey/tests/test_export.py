@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+# tests: mypy, lint
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import tensorflow as tf
+
+from neuralmonkey.export import (freeze_graph, strip_identities,
+                                 save_frozen_model, load_frozen_model,
+                                 quantize_graph, referenced_nodes,
+                                 constant_bytes, FROZEN_GRAPH_SUFFIX)
+
+INPUT_VALUES = np.arange(8, dtype=np.float32).reshape(2, 4)
+ID_VALUES = np.array([3, 0, 9], dtype=np.int32)
+
+
+def _build_model():
+    """Builds a tiny model and returns the objects referring to it."""
+    inputs = tf.placeholder(tf.float32, [None, 4], name="inputs")
+    weights = tf.Variable(
+        np.linspace(-1, 1, 4 * 300).reshape(4, 300).astype(np.float32),
+        name="weights")
+    hidden = tf.identity(tf.matmul(inputs, weights), name="hidden")
+    outputs = tf.nn.relu(hidden, name="outputs")
+
+    ids = tf.placeholder(tf.int32, [None], name="ids")
+    embeddings = tf.Variable(
+        np.linspace(-2, 2, 300 * 4).reshape(300, 4).astype(np.float32),
+        name="embeddings")
+    embedded = tf.gather(embeddings, ids, name="embedded")
+    return {"inputs": inputs, "outputs": outputs,
+            "ids": ids, "embedded": tf.nn.tanh(embedded)}
+
+
+def _run_model(sess, objects):
+    return sess.run([objects["outputs"], objects["embedded"]],
+                    {objects["inputs"]: INPUT_VALUES,
+                     objects["ids"]: ID_VALUES})
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.prefix = os.path.join(self.directory, "frozen_model")
+        self.ini_file = os.path.join(self.directory, "run.ini")
+        with open(self.ini_file, "w") as f_ini:
+            f_ini.write("[main]\noutput=\"{}\"\n".format(self.directory))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _freeze(self, quantize=False):
+        with tf.Graph().as_default():
+            objects = _build_model()
+            sess = tf.Session()
+            sess.run(tf.initialize_all_variables())
+            expected = _run_model(sess, objects)
+            graph_def = freeze_graph(sess, objects)
+            if quantize:
+                graph_def = quantize_graph(
+                    sess, graph_def, {"weights": 1, "embeddings": 0},
+                    referenced_nodes(objects))
+            save_frozen_model(self.prefix, graph_def, objects, self.ini_file)
+        return graph_def, expected
+
+    def _stored_constant_bytes(self):
+        graph_def = tf.GraphDef()
+        with open(self.prefix + FROZEN_GRAPH_SUFFIX, 'rb') as f_graph:
+            graph_def.ParseFromString(f_graph.read())
+        return constant_bytes(graph_def)
+
+    def test_freeze_graph(self):
+        graph_def, _ = self._freeze()
+        ops = [node.op for node in graph_def.node]
+        self.assertNotIn("Variable", ops)
+        self.assertNotIn("Identity", ops)
+
+    def test_strip_identities(self):
+        with tf.Graph().as_default() as graph:
+            const = tf.constant(1.0, name="const")
+            first = tf.identity(const, name="first")
+            second = tf.identity(first, name="second")
+            tf.add(second, 1.0, name="result")
+
+        stripped = strip_identities(graph.as_graph_def(), ["second"])
+        nodes = {node.name: node for node in stripped.node}
+        self.assertNotIn("first", nodes)
+        self.assertEqual(list(nodes["second"].input), ["const"])
+        self.assertEqual(nodes["result"].input[0], "second")
+
+    def test_round_trip(self):
+        _, expected = self._freeze()
+
+        # the option is added to the configuration after the export
+        with open(self.ini_file, "a") as f_ini:
+            f_ini.write("frozen_model=\"{}\"\n".format(self.prefix))
+
+        with tf.Graph().as_default():
+            objects, sess = load_frozen_model(self.prefix, self.ini_file, 1)
+            outputs = _run_model(sess, objects)
+
+        for output, expected_output in zip(outputs, expected):
+            self.assertTrue(np.allclose(output, expected_output))
+
+    def test_quantization(self):
+        _, expected = self._freeze()
+        float_bytes = self._stored_constant_bytes()["float32"]
+        self.assertEqual(float_bytes, 2 * 4 * 300 * 4)
+
+        self._freeze(quantize=True)
+        quantized_bytes = self._stored_constant_bytes()
+        # only the scales of the vocabulary items stay in float32
+        self.assertEqual(quantized_bytes["int8"], 2 * 4 * 300)
+        self.assertLess(quantized_bytes["float32"], float_bytes / 3)
+
+        with tf.Graph().as_default():
+            objects, sess = load_frozen_model(self.prefix, self.ini_file, 1)
+            outputs = _run_model(sess, objects)
+        for output, expected_output in zip(outputs, expected):
+            self.assertTrue(np.allclose(output, expected_output, atol=0.1))
+
+    def test_quantized_runtime(self):
+        graph_def, _ = self._freeze(quantize=True)
+        nodes = {node.name: node for node in graph_def.node}
+
+        # the int8 matrices can be fed, so they are not folded when loaded
+        for name in ["weights", "embeddings"]:
+            self.assertNotIn(name, nodes)
+            self.assertEqual(nodes[name + "_int8"].op,
+                             "PlaceholderWithDefault")
+            self.assertEqual(nodes[name + "_scales"].op,
+                             "PlaceholderWithDefault")
+
+        # the rows are gathered from the int8 matrix and the projection
+        # multiplies by its cast, so the float matrices are not needed
+        self.assertNotIn("weights_dequantized", nodes)
+        self.assertNotIn("embeddings_dequantized", nodes)
+        gathers = [node for node in graph_def.node if node.op == "Gather"]
+        self.assertIn("embeddings_int8", [node.input[0] for node in gathers])
+
+    def test_different_configuration(self):
+        self._freeze()
+        with open(self.ini_file, "a") as f_ini:
+            f_ini.write("threads=2\n")
+
+        with tf.Graph().as_default():
+            with self.assertRaises(ValueError):
+                load_frozen_model(self.prefix, self.ini_file, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
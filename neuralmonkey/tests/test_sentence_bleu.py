@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+# tests: mypy, lint
+
+import unittest
+
+import numpy as np
+
+from neuralmonkey.evaluators.bleu import BLEUEvaluator
+from neuralmonkey.evaluators.sentence_bleu import batch_sentence_bleu
+
+
+class TestSentenceBLEU(unittest.TestCase):
+
+    def test_identical_sentences(self):
+        sentences = np.array([[1, 2, 3, 4, 5, 0], [7, 7, 8, 9, 0, 0]])
+        lengths = np.array([6, 4])
+        for smoothing in ["exp", "add-one", "none"]:
+            bleus = batch_sentence_bleu(sentences, lengths, sentences,
+                                        lengths, smoothing=smoothing)
+            self.assertTrue(np.allclose(bleus, 1.0))
+
+    def test_empty_hypothesis(self):
+        bleus = batch_sentence_bleu(np.array([[1, 2]]), np.array([0]),
+                                    np.array([[1, 2]]), np.array([2]))
+        self.assertEqual(bleus[0], 0.0)
+
+    def test_unigram_bleu(self):
+        hypothesis = [3, 5, 6, 2]
+        reference = [1, 3, 5, 6, 7]
+        bleus = batch_sentence_bleu(np.array([hypothesis + [0]]),
+                                    np.array([4]),
+                                    np.array([reference]), np.array([5]),
+                                    ngrams=1)
+        self.assertAlmostEqual(
+            bleus[0],
+            BLEUEvaluator.bleu([[str(i) for i in hypothesis]],
+                               [[[str(i) for i in reference]]],
+                               ngrams=1))
+
+    def test_clipped_counts(self):
+        bleus = batch_sentence_bleu(np.array([[4, 4, 4, 4]]), np.array([4]),
+                                    np.array([[4, 5, 6, 7]]), np.array([4]),
+                                    ngrams=1)
+        self.assertAlmostEqual(bleus[0], 0.25)
+
+    def test_negative_indices_never_match(self):
+        bleus = batch_sentence_bleu(np.array([[1, 2]]), np.array([2]),
+                                    np.array([[-1, -1]]), np.array([2]),
+                                    ngrams=1, smoothing="none")
+        self.assertEqual(bleus[0], 0.0)
+
+    def test_unknown_smoothing(self):
+        with self.assertRaises(ValueError):
+            batch_sentence_bleu(np.array([[1]]), np.array([1]),
+                                np.array([[1]]), np.array([1]),
+                                smoothing="magic")
+
+
+if __name__ == "__main__":
+    unittest.main()
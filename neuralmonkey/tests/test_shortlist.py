@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+# tests: mypy, lint
+
+import os
+import tempfile
+import unittest
+
+from neuralmonkey.dataset import Dataset
+from neuralmonkey.shortlist import LexicalShortlist
+from neuralmonkey.vocabulary import (Vocabulary, PAD_TOKEN, START_TOKEN,
+                                     END_TOKEN, UNK_TOKEN)
+
+TARGET_TEXT = "der die das der der die haus katze hund maus".split()
+
+LEXICAL_TABLE = """haus haus 0.9
+haus gebaeude 0.5
+haus heim 0.1
+cat katze 0.8
+cat kater 0.7
+dog hund
+dog unknownword 1.0
+"""
+
+
+class TestShortlist(unittest.TestCase):
+
+    def setUp(self):
+        self.vocabulary = Vocabulary(
+            tokenized_text=TARGET_TEXT + ["gebaeude", "heim"])
+        handle, self.table = tempfile.mkstemp()
+        with os.fdopen(handle, "w") as f_table:
+            f_table.write(LEXICAL_TABLE)
+
+    def tearDown(self):
+        os.remove(self.table)
+
+    def _candidate_words(self, shortlist, sentences):
+        dataset = Dataset("test", {"source": sentences}, {})
+        indices = shortlist.candidates(dataset)
+        return [self.vocabulary.index_to_word[i] for i in indices]
+
+    def test_special_tokens(self):
+        shortlist = LexicalShortlist(self.table, self.vocabulary, "source",
+                                     frequent_words=0)
+        words = self._candidate_words(shortlist, [["nothing"]])
+        self.assertEqual(sorted(words), sorted(
+            [PAD_TOKEN, START_TOKEN, END_TOKEN, UNK_TOKEN]))
+        # the padding symbol is always the first one
+        self.assertEqual(words[0], PAD_TOKEN)
+
+    def test_frequent_words(self):
+        shortlist = LexicalShortlist(self.table, self.vocabulary, "source",
+                                     frequent_words=2)
+        words = self._candidate_words(shortlist, [[]])
+        self.assertIn("der", words)
+        self.assertIn("die", words)
+        self.assertNotIn("das", words)
+
+    def test_translations_per_word(self):
+        shortlist = LexicalShortlist(self.table, self.vocabulary, "source",
+                                     translations_per_word=2,
+                                     frequent_words=0)
+        words = self._candidate_words(shortlist,
+                                      [["haus", "dog"], ["cat"]])
+        # the two most probable translations, the words missing in the
+        # vocabulary are skipped
+        for word in ["haus", "gebaeude", "hund", "katze"]:
+            self.assertIn(word, words)
+        for word in ["heim", "kater", "unknownword"]:
+            self.assertNotIn(word, words)
+
+    def test_size_cap(self):
+        shortlist = LexicalShortlist(self.table, self.vocabulary, "source",
+                                     translations_per_word=1,
+                                     frequent_words=3)
+        words = self._candidate_words(
+            shortlist, [["haus", "cat", "dog", "haus", "cat"]])
+        # four special tokens, three frequent words and at most one
+        # translation of each of the three distinct source words
+        self.assertLessEqual(len(words), 4 + 3 + 3)
+        self.assertEqual(len(words), len(set(words)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+# tests: mypy, lint
+
+import unittest
+
+from neuralmonkey.evaluators.accuracy import Accuracy
+from neuralmonkey.evaluators.bleu import BLEUEvaluator
+from neuralmonkey.evaluators.edit_distance import EditDistance
+from neuralmonkey.evaluators.perplexity import Perplexity
+from neuralmonkey.evaluators.streaming import StreamingEvaluator
+from neuralmonkey.evaluators.bleu_ref import BLEUReferenceImplWrapper
+
+
+CORPUS_DECODED = [
+    "colorful thoughts furiously sleep",
+    "little piglet slept all night",
+    "working working working working working be be be be be be be",
+    "ich bin walrus",
+    "walrus for präsident",
+    ""
+]
+
+CORPUS_REFERENCE = [
+    "the colorless ideas slept furiously",
+    "pooh slept all night",
+    "working class hero is something to be",
+    "I am the working class walrus",
+    "walrus for president",
+    "something"
+]
+
+
+DECODED = [d.split() for d in CORPUS_DECODED]
+REFERENCE = [r.split() for r in CORPUS_REFERENCE]
+
+
+def streamed_score(evaluator, decoded, references, batch_size):
+    streaming = StreamingEvaluator(evaluator)
+    for start in range(0, len(decoded), batch_size):
+        streaming.add(decoded[start:start + batch_size],
+                      references[start:start + batch_size])
+    return streaming.score()
+
+
+class TestStreaming(unittest.TestCase):
+
+    def test_same_as_corpus_score(self):
+        for evaluator in [BLEUEvaluator(), BLEUEvaluator(n=2),
+                          BLEUEvaluator(deduplicate=True), Accuracy(),
+                          EditDistance()]:
+            for batch_size in [1, 2, 4, 100]:
+                self.assertAlmostEqual(
+                    streamed_score(evaluator, DECODED, REFERENCE, batch_size),
+                    evaluator(DECODED, REFERENCE))
+
+    def test_perplexity(self):
+        perplexities = [1.5, 20.0, 3.25, 7.0, 11.0]
+        self.assertAlmostEqual(
+            streamed_score(Perplexity(), perplexities,
+                           [None for _ in perplexities], 2),
+            Perplexity()(perplexities, None))
+
+    def test_partial_score(self):
+        streaming = StreamingEvaluator(BLEUEvaluator())
+        streaming.add(REFERENCE[:2], REFERENCE[:2])
+        self.assertAlmostEqual(streaming.score(), 100)
+        self.assertEqual(streaming.sentences, 2)
+
+        streaming.reset()
+        with self.assertRaises(ValueError):
+            streaming.score()
+
+    def test_unsupported_evaluator(self):
+        evaluator = BLEUReferenceImplWrapper("wrapper.pl")
+        with self.assertRaises(ValueError):
+            StreamingEvaluator(evaluator)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,8 +12,13 @@ import tensorflow as tf
 from neuralmonkey.checking import check_dataset_and_coders
 from neuralmonkey.logging import Logging, log
 from neuralmonkey.config.configuration import Configuration
-from neuralmonkey.learning_utils import training_loop, initialize_tf
+from neuralmonkey.config.main_options import ignore_other_options
+from neuralmonkey.learning_utils import training_loop, initialize_tf, \
+    feed_dict_cache, evaluator_pool, can_log_from_train_step
 from neuralmonkey.dataset import Dataset
+from neuralmonkey.data_parallel import DataParallelTrainer
+from neuralmonkey.async_validation import checkpoint_files
+from neuralmonkey.checkpointing import load_state
 
 def create_config(config_file):
     config = Configuration()
@@ -39,9 +44,57 @@ def create_config(config_file):
     config.add_argument('save_n_best', int, required=False, default=1)
     config.add_argument('overwrite_output_dir', bool, required=False,
                         default=False)
+    config.add_argument('async_validation', bool, required=False,
+                        default=False)
+    config.add_argument('feed_dict_cache_mb', int, required=False,
+                        default=256, cond=lambda x: x >= 0)
+    config.add_argument('log_from_train_step', bool, required=False,
+                        default=False)
+    config.add_argument('workers', int, required=False, default=1,
+                        cond=lambda x: x >= 1)
+    config.add_argument('async_checkpoints', bool, required=False,
+                        default=False)
+    config.add_argument('resume', bool, required=False, default=False)
+    config.add_argument('step_timing', bool, required=False, default=False)
+    config.add_argument('trace_period', int, required=False, default=0,
+                        cond=lambda x: x >= 0)
+    config.add_argument('trace_validation_period', int, required=False,
+                        default=0, cond=lambda x: x >= 0)
+    config.add_argument('evaluation_processes', int, required=False,
+                        default=1, cond=lambda x: x >= 1)
+
+    # ignore arguments which are just for running
+    ignore_other_options(config)
 
     return config.load_file(config_file)
 
+def _find_resume_checkpoint(output, cont_index):
+    """Finds the latest checkpoint with the training state from the previous
+    runs of the experiment.
+
+    Arguments:
+        output: The experiment directory.
+        cont_index: Index of the current continuation of the experiment.
+
+    Returns:
+        A tuple of the checkpoint path and the training state, or a tuple of
+        Nones if there is no such checkpoint.
+    """
+    for index in reversed(range(cont_index)):
+        if index == 0:
+            prefix = "{}/variables.data".format(output)
+        else:
+            prefix = "{}/variables.data.cont-{}".format(output, index)
+
+        last_file = "{}.last".format(prefix)
+        state = load_state(last_file)
+        if state is not None:
+            log("Resuming from {}".format(last_file))
+            return last_file, state
+
+    log("No checkpoint to resume from, starting from scratch.", color='red')
+    return None, None
+
 def main():
     if len(sys.argv) != 2:
         print("Usage: train.py <ini_file>")
@@ -55,9 +108,17 @@ def main():
     if args.random_seed is not None:
         tf.set_random_seed(args.random_seed)
 
+    if (args.log_from_train_step
+            and not can_log_from_train_step(args.trainer, args.runner)):
+        log("The option log_from_train_step requires a trainer accepting "
+            "additional fetches and a runner providing them ({} and {} "
+            "given).".format(type(args.trainer).__name__,
+                             type(args.runner).__name__), color='red')
+        exit(1)
+
     if os.path.isdir(args.output) and \
             os.path.exists(os.path.join(args.output, "experiment.ini")):
-        if args.overwrite_output_dir:
+        if args.overwrite_output_dir or args.resume:
             # we do not want to delete the directory contents
             log("Directory with experiment.ini '{}' exists, "
                 "overwriting enabled, proceeding."
@@ -111,6 +172,11 @@ def main():
         variables_file_prefix = "{}/variables.data.cont-{}".format(
             args.output, cont_index)
 
+    resume_variables, resume_state = None, None
+    if args.resume:
+        resume_variables, resume_state = _find_resume_checkpoint(
+            args.output, cont_index)
+
     copyfile(sys.argv[1], ini_file)
     Logging.set_log_file(log_file)
     Logging.print_header(args.name)
@@ -120,7 +186,24 @@ def main():
 
     link_best_vars = "{}.best".format(variables_file_prefix)
 
-    sess, saver = initialize_tf(args.initial_variables, args.threads)
+    feed_dict_cache.max_bytes = args.feed_dict_cache_mb * 1024 * 1024
+    evaluator_pool.processes = args.evaluation_processes
+
+    if resume_variables is not None:
+        sess, saver = initialize_tf(resume_variables, args.threads)
+    else:
+        sess, saver = initialize_tf(args.initial_variables, args.threads)
+
+    parallel_trainer = None
+    if args.workers > 1:
+        # the replicas in the workers start from the same variable values
+        workers_init = "{}.workers-init".format(variables_file_prefix)
+        saver.save(sess, workers_init, write_meta_graph=False)
+        parallel_trainer = DataParallelTrainer(args.trainer, ini_file,
+                                               args.workers, workers_init)
+        for path, _ in checkpoint_files(workers_init):
+            os.remove(path)
+
     training_loop(sess, saver, args.epochs, args.trainer,
                   args.encoders + [args.decoder], args.decoder,
                   args.batch_size, args.train_dataset, args.val_dataset,
@@ -132,4 +215,16 @@ def main():
                   logging_period=args.logging_period,
                   validation_period=args.validation_period,
                   postprocess=args.postprocess,
-                  minimize_metric=args.minimize)
+                  minimize_metric=args.minimize,
+                  async_validation_ini=(ini_file if args.async_validation
+                                        else None),
+                  log_from_train_step=args.log_from_train_step,
+                  parallel_trainer=parallel_trainer,
+                  async_checkpoints=args.async_checkpoints,
+                  resume_state=resume_state,
+                  save_resume_checkpoints=args.resume,
+                  step_timing=args.step_timing,
+                  trace_period=args.trace_period,
+                  trace_validation_period=args.trace_validation_period)
+
+    evaluator_pool.close()
@@ -3,6 +3,9 @@
 import tensorflow as tf
 import numpy as np
 
+from neuralmonkey.trainers.sparse_updates import (LazyAdamOptimizer,
+                                                  add_l2_gradients)
+
 # tests: mypy
 
 class CopyNetTrainer(object):
@@ -13,7 +16,7 @@ class CopyNetTrainer(object):
     trainer requires feeding additional information to the computation graph
     (see feed_dict method).
     """
-    def __init__(self, decoder, l2_regularization):
+    def __init__(self, decoder, l2_regularization, sparse_updates=False):
         self.decoder = decoder
 
         self.copy_target_plc = [tf.placeholder(tf.int64, shape=[None]) for _ in decoder.copynet_logits]
@@ -35,8 +38,14 @@ class CopyNetTrainer(object):
 
             tf.scalar_summary('train_l2_cost', l2_value, collections=["summary_train"])
 
-        optimizer = tf.train.AdamOptimizer(1e-4)
-        gradients = optimizer.compute_gradients(decoder.cost + copy_cost + l2_cost)
+        if sparse_updates:
+            # the L2 penalty would make the embedding gradients dense
+            optimizer = LazyAdamOptimizer(1e-4)
+            gradients = add_l2_gradients(
+                optimizer.compute_gradients(decoder.cost + copy_cost), l2_regularization)
+        else:
+            optimizer = tf.train.AdamOptimizer(1e-4)
+            gradients = optimizer.compute_gradients(decoder.cost + copy_cost + l2_cost)
         #for (g, v) in gradients:
         #    if g is not None:
         #        tf.histogram_summary('gr_' + v.name, g, collections=["summary_gradients"])
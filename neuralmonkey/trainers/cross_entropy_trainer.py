@@ -1,14 +1,40 @@
 import tensorflow as tf
 
 from neuralmonkey.logging import log
+from neuralmonkey.trainers.sparse_updates import (LazyAdamOptimizer,
+                                                  add_l2_gradients)
 
 # tests: mypy
 
 class CrossEntropyTrainer(object):
-    def __init__(self, decoder, l2_regularization):
+    def __init__(self, decoder, l2_regularization, use_sampled_loss=False,
+                 sparse_updates=False, accumulation_steps=1):
         log("Initializing Cross-entropy trainer.")
         self.decoder = decoder
 
+        if accumulation_steps < 1:
+            raise ValueError("The number of accumulation steps must be "
+                             "positive.")
+        if accumulation_steps > 1 and sparse_updates:
+            # the gradients are accumulated in dense variables, so the lazy
+            # optimizer would update all the rows anyway
+            raise ValueError("The sparse updates cannot be combined with "
+                             "the gradient accumulation.")
+        self.accumulation_steps = accumulation_steps
+        # the number of the accumulated steps since the last update, read
+        # from the (possibly restored) graph before the first step
+        self.micro_steps = None # type: int
+        self.accumulated_steps = None # type: tf.Variable
+
+        if use_sampled_loss:
+            if getattr(decoder, "sampled_loss", None) is None:
+                raise ValueError("The decoder does not provide a sampled "
+                                 "loss, set 'sampled_softmax_samples'.")
+            log("Optimizing the sampled loss of the decoder.")
+            cost = decoder.sampled_loss
+        else:
+            cost = decoder.cost
+
         with tf.variable_scope("l2_regularization"):
             l2_value = sum([tf.reduce_sum(v ** 2) for v in tf.trainable_variables()])
             if l2_regularization > 0:
@@ -18,22 +44,157 @@ class CrossEntropyTrainer(object):
 
             tf.scalar_summary('train_l2_cost', l2_value, collections=["summary_train"])
 
-        optimizer = tf.train.AdamOptimizer(1e-4)
-        gradients = optimizer.compute_gradients(decoder.cost + l2_cost)
+        if sparse_updates:
+            # the L2 penalty would make the embedding gradients dense
+            optimizer = LazyAdamOptimizer(1e-4)
+            gradients = add_l2_gradients(
+                optimizer.compute_gradients(cost), l2_regularization)
+        else:
+            optimizer = tf.train.AdamOptimizer(1e-4)
+            gradients = optimizer.compute_gradients(cost + l2_cost)
         #for (g, v) in gradients:
         #    if g is not None:
         #        tf.histogram_summary('gr_' + v.name, g, collections=["summary_gradients"])
-        self.optimize_op = optimizer.apply_gradients(gradients, global_step=decoder.learning_step)
+        gradients = [(g, v) for g, v in gradients if g is not None]
+        if accumulation_steps > 1:
+            # the optimize op only accumulates the gradients, the variables
+            # are updated every accumulation_steps steps by the apply op
+            self.optimize_op, self.apply_accumulated_op = \
+                self._gradient_accumulation(optimizer, gradients,
+                                            decoder.learning_step)
+        else:
+            self.optimize_op = optimizer.apply_gradients(gradients, global_step=decoder.learning_step)
+            self.apply_accumulated_op = None
+        # used for applying gradients computed elsewhere
+        self.gradients = [g for g, _ in gradients]
         #self.summary_gradients = tf.merge_summary(tf.get_collection("summary_gradients"))
         self.summary_train = tf.merge_summary(tf.get_collection("summary_train"))
         log("Trainer initialized.")
 
-    def run(self, sess, f_dict, summary=False):
+    def _gradient_accumulation(self, optimizer, gradients, global_step):
+        """Creates the operations for the gradient accumulation.
+
+        Arguments:
+            optimizer: The optimizer used for the update.
+            gradients: List of (gradient, variable) pairs.
+            global_step: The variable counting the updates.
+
+        Returns:
+            A tuple of the operation adding the gradients to the accumulators
+            and the operation which in addition updates the variables with
+            the averaged accumulated gradients and resets the accumulators.
+        """
+        with tf.variable_scope("gradient_accumulation"):
+            accumulators = [
+                tf.Variable(tf.zeros(v.get_shape(), dtype=v.dtype.base_dtype),
+                            trainable=False, name="accumulator")
+                for _, v in gradients]
+
+            # saved with the accumulators, so the training can be resumed
+            # in the middle of the accumulation
+            self.accumulated_steps = tf.Variable(0, trainable=False,
+                                                 name="accumulated_steps")
+
+        accumulate_ops = [tf.assign_add(self.accumulated_steps, 1)]
+        for acc, (grad, _) in zip(accumulators, gradients):
+            if isinstance(grad, tf.IndexedSlices):
+                accumulate_ops.append(
+                    tf.scatter_add(acc, grad.indices, grad.values))
+            else:
+                accumulate_ops.append(tf.assign_add(acc, grad))
+        accumulate_op = tf.group(*accumulate_ops)
+
+        with tf.control_dependencies([accumulate_op]):
+            apply_op = optimizer.apply_gradients(
+                [(acc / self.accumulation_steps, v)
+                 for acc, (_, v) in zip(accumulators, gradients)],
+                global_step=global_step)
+
+        with tf.control_dependencies([apply_op]):
+            reset_op = tf.group(
+                tf.assign(self.accumulated_steps, 0),
+                *[tf.assign(acc, tf.zeros_like(acc)) for acc in accumulators])
+
+        return accumulate_op, reset_op
+
+    def _step_op(self, sess):
+        """Returns the operation for the next optimization step."""
+        if self.apply_accumulated_op is None:
+            return self.optimize_op
+
+        if self.micro_steps is None:
+            self.micro_steps = int(sess.run(self.accumulated_steps))
+
+        self.micro_steps += 1
+        if self.micro_steps >= self.accumulation_steps:
+            self.micro_steps = 0
+            return self.apply_accumulated_op
+        return self.optimize_op
+
+    def run(self, sess, f_dict, summary=False, fetches=None):
+        """Runs one optimization step.
+
+        Arguments:
+            sess: TF session.
+            f_dict: The feed dictionary of the training batch.
+            summary: Flag whether to compute the training summaries.
+            fetches: List of additional tensors computed in the same run as
+                the optimization (e.g. the decoded outputs for logging). They
+                may be computed before or after the variables are updated.
+
+        Returns:
+            The summary string (or None) if no additional fetches are
+            requested, otherwise a tuple of the summary string and the
+            values of the fetches.
+        """
+        to_run = [self._step_op(sess)]
         if summary:
-            _, summary_str = \
-                   sess.run([self.optimize_op,
-                             self.summary_train],#, self.summary_gradients
-                            feed_dict=f_dict)
-            return summary_str
-        else:
-            sess.run(self.optimize_op, feed_dict=f_dict)
+            to_run.append(self.summary_train)
+        if fetches:
+            to_run += fetches
+
+        computation = sess.run(to_run, feed_dict=f_dict)
+        summary_str = computation[1] if summary else None
+
+        if fetches:
+            return summary_str, computation[len(to_run) - len(fetches):]
+        return summary_str
+
+    def compute_gradients(self, sess, f_dict, summary=False):
+        """Computes the gradients without updating the variables.
+
+        Arguments:
+            sess: TF session.
+            f_dict: The feed dictionary of the training batch.
+            summary: Flag whether to compute the training summaries.
+
+        Returns:
+            A tuple of the list of the gradient values and the summary string
+            (or None).
+        """
+        to_run = list(self.gradients)
+        if summary:
+            to_run.append(self.summary_train)
+
+        computation = sess.run(to_run, feed_dict=f_dict)
+        if summary:
+            return computation[:-1], computation[-1]
+        return computation, None
+
+    def apply_gradients(self, sess, gradient_values):
+        """Updates the variables using the given gradient values.
+
+        Arguments:
+            sess: TF session.
+            gradient_values: The values of the gradients as returned by
+                ``compute_gradients`` (possibly averaged).
+        """
+        f_dict = {}
+        for grad, value in zip(self.gradients, gradient_values):
+            if isinstance(grad, tf.IndexedSlices):
+                f_dict[grad.values] = value.values
+                f_dict[grad.indices] = value.indices
+            else:
+                f_dict[grad] = value
+
+        sess.run(self._step_op(sess), feed_dict=f_dict)
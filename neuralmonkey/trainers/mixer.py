@@ -1,7 +1,9 @@
+import numpy as np
 import tensorflow as tf
 
 from neuralmonkey.logging import log
-from neuralmonkey.evaluators.bleu import BLEUEvaluator
+from neuralmonkey.vocabulary import END_TOKEN
+from neuralmonkey.evaluators.sentence_bleu import batch_sentence_bleu
 
 # tests: mypy
 # TODO refactor to have the same API as cross-entropy trainer
@@ -16,7 +18,8 @@ class Mixer(object):
     starts to use the reinforce algorithm for the optimization.
 
     """
-    def __init__(self, decoder, initial_trainer, xent_calls, moving_calls):
+    def __init__(self, decoder, initial_trainer, xent_calls, moving_calls,
+                 bleu_ngrams=1, bleu_smoothing="exp"):
         """
         Constructs the TensorFlow graph for the MIXER code - i.e. the regressor
         estimating BLEU from hidden states and the gradients from the REINFORCE
@@ -33,6 +36,12 @@ class Mixer(object):
                 proceed to use the REINFORCE algorithm for a longer suffix of the
                 senntences.
 
+            bleu_ngrams: Maximum order of n-grams of the sentence BLEU used as
+                the reward.
+
+            bleu_smoothing: Smoothing of the sentence BLEU, one of 'exp',
+                'add-one' and 'none'.
+
         """
         # TODO L2 regularization
         # TODO plot gradients
@@ -41,6 +50,8 @@ class Mixer(object):
         self.called = 0
         self.xent_calls = xent_calls
         self.moving_calls = moving_calls
+        self.bleu_ngrams = bleu_ngrams
+        self.bleu_smoothing = bleu_smoothing
 
         with tf.variable_scope('mixer'):
             # BLEU score needs to be computed outside the TF
@@ -152,21 +163,7 @@ class Mixer(object):
         reinforce_steps = max(self.decoder.max_output_len + 2, (self.called - self.xent_calls) / self.moving_calls + 1)
 
         decoded_sequence = sess.run(self.decoder.decoded_seq, feed_dict=fd)
-        sentences = self.decoder.vocabulary.vectors_to_sentences(decoded_sequence)
-
-        def get_bleu(r, s):
-            # sentence BLEU crashes in case of empty sentences
-            if not s:
-                return 0.0
-            else:
-                ## TODO think about what this should be - BLEU over one sentence
-                ## seems weird.
-                return BLEUEvaluator.bleu([s], [[r]], ngrams=1)
-
-        bleus = [get_bleu(r, s) for r, s in zip(references, sentences)]
-
-
-        fd[self.bleu] = bleus
+        fd[self.bleu] = self._sentence_bleus(decoded_sequence, references)
 
         for i, w_plc in enumerate(reversed(self.mixer_weights_plc)):
             if i <= reinforce_steps:
@@ -186,3 +183,29 @@ class Mixer(object):
         sess.run(self.regression_optimizer, feed_dict=fd)
 
         return computation
+
+    def _sentence_bleus(self, decoded_sequence, references):
+        """Computes the sentence BLEU of the decoded batch directly on the
+        vocabulary indices, without converting the sentences to words."""
+        vocabulary = self.decoder.vocabulary
+
+        hypotheses = np.stack(decoded_sequence, axis=1)
+        ends = hypotheses == vocabulary.get_word_index(END_TOKEN)
+        hypothesis_lengths = np.where(np.any(ends, axis=1),
+                                      np.argmax(ends, axis=1),
+                                      hypotheses.shape[1])
+
+        # the words missing in the vocabulary get a negative index, so they
+        # never match the decoded words
+        reference_lengths = np.array([len(r) for r in references])
+        reference_indices = np.full(
+            (len(references), max(1, reference_lengths.max())), -1,
+            dtype=np.int64)
+        for i, ref in enumerate(references):
+            reference_indices[i, :len(ref)] = [
+                vocabulary.word_to_index.get(w, -1) for w in ref]
+
+        return batch_sentence_bleu(
+            hypotheses, hypothesis_lengths, reference_indices,
+            reference_lengths, ngrams=self.bleu_ngrams,
+            smoothing=self.bleu_smoothing)
@@ -0,0 +1,102 @@
+"""
+This module implements the sparse (lazy) updates of the model parameters.
+
+The gradients of the embedding matrices are sparse: a batch touches only a
+few hundred rows of the matrices. The standard Adam optimizer nevertheless
+decays the moment estimates of all the rows in every step and the L2
+regularization term added to the cost makes the gradients dense. Here, both
+the optimizer step and the L2 penalty are applied only to the rows that
+appear in the current batch.
+"""
+# tests: lint, mypy
+
+import tensorflow as tf
+
+
+class LazyAdamOptimizer(tf.train.AdamOptimizer):
+    """Adam optimizer which updates the moment estimates and the variables
+    only in the rows present in a sparse gradient.
+
+    For dense gradients, the behavior is the same as in the original Adam
+    optimizer.
+    """
+
+    def _apply_sparse(self, grad, var):
+        dtype = var.dtype.base_dtype
+        beta1_power = tf.cast(self._beta1_power, dtype)
+        beta2_power = tf.cast(self._beta2_power, dtype)
+        lr_t = tf.cast(self._lr_t, dtype)
+        beta1_t = tf.cast(self._beta1_t, dtype)
+        beta2_t = tf.cast(self._beta2_t, dtype)
+        epsilon_t = tf.cast(self._epsilon_t, dtype)
+
+        learning_rate = lr_t * tf.sqrt(1 - beta2_power) / (1 - beta1_power)
+
+        # a word can appear in the batch many times, its gradients must be
+        # summed before the rows are updated
+        indices, values = unique_rows(grad)
+
+        m = self.get_slot(var, "m")
+        m_rows = beta1_t * tf.gather(m, indices) + (1 - beta1_t) * values
+        m_update = tf.scatter_update(m, indices, m_rows,
+                                     use_locking=self._use_locking)
+
+        v = self.get_slot(var, "v")
+        v_rows = (beta2_t * tf.gather(v, indices)
+                  + (1 - beta2_t) * tf.square(values))
+        v_update = tf.scatter_update(v, indices, v_rows,
+                                     use_locking=self._use_locking)
+
+        var_update = tf.scatter_sub(
+            var, indices,
+            learning_rate * m_rows / (tf.sqrt(v_rows) + epsilon_t),
+            use_locking=self._use_locking)
+
+        return tf.group(var_update, m_update, v_update)
+
+
+def unique_rows(grad):
+    """Sums the values of a sparse gradient with the same indices.
+
+    Arguments:
+        grad: The gradient as IndexedSlices.
+
+    Returns:
+        A tuple of the unique indices and the summed values.
+    """
+    indices, positions = tf.unique(grad.indices)
+    values = tf.unsorted_segment_sum(grad.values, positions,
+                                     tf.shape(indices)[0])
+    return indices, values
+
+
+def add_l2_gradients(gradients, l2_regularization):
+    """Adds the gradient of the L2 penalty to the computed gradients.
+
+    For the sparse gradients, the penalty is applied only to the rows present
+    in the gradient, so the gradient remains sparse.
+
+    Arguments:
+        gradients: List of (gradient, variable) pairs as returned by
+            ``compute_gradients``.
+        l2_regularization: The weight of the L2 penalty.
+
+    Returns:
+        The new list of (gradient, variable) pairs.
+    """
+    if l2_regularization <= 0:
+        return gradients
+
+    regularized = []
+    for grad, var in gradients:
+        if grad is None:
+            regularized.append((grad, var))
+        elif isinstance(grad, tf.IndexedSlices):
+            indices, values = unique_rows(grad)
+            values += 2 * l2_regularization * tf.gather(var, indices)
+            regularized.append(
+                (tf.IndexedSlices(values, indices, grad.dense_shape), var))
+        else:
+            regularized.append((grad + 2 * l2_regularization * var, var))
+
+    return regularized